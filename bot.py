@@ -1,19 +1,15 @@
-import toml
-import discord
-
 import cogs._utils.library_override  # pyright: ignore[reportUnusedImport]
-from cogs._utils.subclasses import Bot
+from cogs._utils.subclasses import create_bot
+from cogs._utils.config import load_config
+from cogs._utils.startup import StartupTimeline
 
 
-with open("Config.toml") as f:
-    config = toml.load(f)
+timeline = StartupTimeline()
 
-bot = Bot(
-    intents=discord.Intents().all(),
-    case_insensitive=True,
-    strip_after_prefix=True,
-    config=config,
-)
+with timeline.phase("config"):
+    config = load_config("Config.toml")
+
+bot = create_bot(config, timeline=timeline)
 
 bot.run(
     config["Bot"]["TOKEN"],
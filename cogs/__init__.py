@@ -3,7 +3,9 @@ from discord.ext import commands
 
 import logging
 
-from typing import TYPE_CHECKING
+from ._utils.intents import IncompatibleCachePolicy, Requirements
+
+from typing import TYPE_CHECKING, Any, ClassVar
 
 logger = logging.getLogger("discord")
 
@@ -12,10 +14,24 @@ if TYPE_CHECKING:
 
 
 class BaseCog(commands.Cog):
+    # what the cog needs from the intents and caches, checked when it's loaded.
+    REQUIREMENTS: ClassVar[Requirements] = Requirements()
+    # attributes (dotted paths from the cog) holding caches, sized by the `memory` command.
+    MEMORY: ClassVar[tuple[str, ...]] = ()
+
     def __init__(self, bot: "Bot") -> None:
         self.bot = bot
-        self.CONFIG = bot.config["Cogs"].get(self.__cog_name__)
         if self.CONFIG and not self.CONFIG.get("ENABLED", True):
             raise Exception(
                 f"{self.__cog_name__} is disabled. Please re-enable it or move it outside of the cog folder."
             )
+
+        if problems := bot.cache_policy.check(self.REQUIREMENTS):
+            raise IncompatibleCachePolicy(
+                [f"{self.__cog_name__} {problem}" for problem in problems]
+            )
+
+    @property
+    def CONFIG(self) -> Any:
+        # read through the snapshot, so it's always up to date after a config reload.
+        return self.bot.snapshot.cog(self.__cog_name__)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from aiohttp import ClientResponse
+
+from typing import Optional
+
+
+class TooLarge(Exception):
+    def __init__(self, size: int, limit: int) -> None:
+        super().__init__(f"{size} bytes is over the limit of {limit} bytes.")
+        self.size = size
+        self.limit = limit
+
+
+class PooledBuffer:
+    """
+    A growable buffer that's handed back to its pool when it's no longer needed.
+
+    Writes go into the existing capacity, which is only replaced (never resized)
+    when it runs out, so a `memoryview` taken earlier can't stop it from growing.
+    """
+
+    __slots__ = ("pool", "data", "length")
+
+    def __init__(self, pool: Optional[BufferPool], size: int) -> None:
+        self.pool = pool
+        self.data = bytearray(size)
+        self.length = 0
+
+    def write(self, chunk: bytes) -> None:
+        end = self.length + len(chunk)
+        if end > len(self.data):
+            grown = bytearray(max(end, len(self.data) * 2))
+            grown[: self.length] = self.data[: self.length]
+            self.data = grown
+
+        self.data[self.length : end] = chunk
+        self.length = end
+
+    @property
+    def view(self) -> memoryview:
+        """
+        What's been written so far, without copying it.
+        """
+        return memoryview(self.data)[: self.length]
+
+    def release(self) -> None:
+        if self.pool is not None:
+            self.pool.release(self)
+
+
+class BufferPool:
+    """
+    Reuses buffers across downloads, so peak memory only depends on how many run at once.
+
+    Buffers that grew past `retain_size` aren't kept, a single large download
+    shouldn't hold on to that much memory for good.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_size: int = 256 * 1024,
+        retain_size: int = 4 * 1024 * 1024,
+        max_buffers: int = 32,
+    ) -> None:
+        self.initial_size = initial_size
+        self.retain_size = retain_size
+        self.max_buffers = max_buffers
+
+        self.free: list[PooledBuffer] = []
+        self.created = 0
+
+    def acquire(self) -> PooledBuffer:
+        if self.free:
+            buffer = self.free.pop()
+            buffer.length = 0
+            return buffer
+
+        self.created += 1
+        return PooledBuffer(self, self.initial_size)
+
+    def release(self, buffer: PooledBuffer) -> None:
+        if len(buffer.data) > self.retain_size or len(self.free) >= self.max_buffers:
+            return
+
+        self.free.append(buffer)
+
+
+async def read_limited(
+    response: ClientResponse,
+    buffer: PooledBuffer,
+    limit: int,
+    *,
+    chunk_size: int = 64 * 1024,
+) -> memoryview:
+    """
+    Streams a response body into `buffer`, raising `TooLarge` as soon as it's known to be over `limit`.
+
+    That's before reading anything if there's a `Content-Length`, otherwise once the
+    chunks read add up to more than `limit`. The rest of the body is never read.
+    """
+    if response.content_length is not None and response.content_length > limit:
+        raise TooLarge(response.content_length, limit)
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if buffer.length + len(chunk) > limit:
+            raise TooLarge(buffer.length + len(chunk), limit)
+
+        buffer.write(chunk)
+
+    return buffer.view
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import math
+import time
+import asyncio
+import logging
+import itertools
+import threading
+import multiprocessing
+
+from aiohttp import ClientSession
+from multiprocessing.connection import Connection, wait
+
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+
+
+logger = logging.getLogger("discord")
+
+# Messages are plain dicts sent over a `multiprocessing.Pipe`:
+#   {"op": OP, "data": DATA, "origin": CLUSTER_ID, "nonce": NONCE}
+# and replies to a request that had a nonce:
+#   {"op": "reply", "data": DATA, "to": CLUSTER_ID, "nonce": NONCE}
+# The launcher forwards replies to the cluster in `to` and everything else to every other cluster.
+Message = dict[str, Any]
+Handler = Callable[[Any], Awaitable[Any]]
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def shard_groups(shard_count: int, clusters: int) -> list[list[int]]:
+    """
+    Splits the shards into `clusters` contiguous groups.
+    """
+    per_cluster = math.ceil(shard_count / clusters)
+    return [
+        list(range(start, min(start + per_cluster, shard_count)))
+        for start in range(0, shard_count, per_cluster)
+    ]
+
+
+async def recommended_shards(token: str) -> int:
+    async with ClientSession() as session:
+        async with session.get(
+            GATEWAY_URL, headers={"Authorization": f"Bot {token}"}
+        ) as resp:
+            resp.raise_for_status()
+            return (await resp.json())["shards"]
+
+
+class ClusterClient:
+    """
+    A cluster's end of the IPC channel to the launcher.
+
+    The pipe is read from a thread, and messages are handed to the loop like `LogQueue` does.
+    Handlers are registered per op, whatever a handler returns is sent back when
+    the message was a `request`.
+    """
+
+    def __init__(self, conn: Connection, cluster_id: int, cluster_count: int) -> None:
+        self.conn = conn
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+
+        self.handlers: dict[str, Handler] = {}
+
+        self._nonces = itertools.count()
+        self._requests: dict[int, tuple[asyncio.Future[None], list[Any]]] = {}
+        self._send_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def add_handler(self, op: str, handler: Handler) -> None:
+        self.handlers[op] = handler
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        threading.Thread(
+            target=self._read, name=f"cluster-{self.cluster_id}-ipc", daemon=True
+        ).start()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                message: Message = self.conn.recv()
+            except (EOFError, OSError):
+                logger.warning("Lost the connection to the cluster launcher.")
+                return
+
+            loop = self._loop
+            if loop is None or loop.is_closed():
+                return
+
+            loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _send(self, message: Message) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    def _dispatch(self, message: Message) -> None:
+        if message["op"] == "reply":
+            pending = self._requests.get(message["nonce"])
+            if pending is None:  # came in after the request timed out.
+                return
+
+            future, replies = pending
+            replies.append(message["data"])
+            if len(replies) >= self.cluster_count - 1 and not future.done():
+                future.set_result(None)
+            return
+
+        handler = self.handlers.get(message["op"])
+        if handler is None:
+            logger.warning(f"No IPC handler for the op {message['op']!r}.")
+            return
+
+        asyncio.create_task(self._handle(handler, message))
+
+    async def _handle(self, handler: Handler, message: Message) -> None:
+        try:
+            result = await handler(message["data"])
+        except Exception:
+            logger.exception(f"IPC handler for {message['op']!r} failed:")
+            result = None
+
+        if message.get("nonce") is not None:
+            self._send(
+                {
+                    "op": "reply",
+                    "data": result,
+                    "to": message["origin"],
+                    "nonce": message["nonce"],
+                }
+            )
+
+    def broadcast(self, op: str, data: Any = None) -> None:
+        """
+        Sends `op` to every other cluster, without waiting on anything.
+        """
+        self._send({"op": op, "data": data, "origin": self.cluster_id})
+
+    async def request(
+        self, op: str, data: Any = None, *, timeout: float = 5.0
+    ) -> list[Any]:
+        """
+        Sends `op` to every other cluster and returns their replies,
+        clusters that didn't reply within `timeout` are left out.
+        """
+        if self.cluster_count <= 1:
+            return []
+
+        nonce = next(self._nonces)
+        future = asyncio.get_running_loop().create_future()
+        replies: list[Any] = []
+        self._requests[nonce] = (future, replies)
+
+        try:
+            self._send(
+                {"op": op, "data": data, "origin": self.cluster_id, "nonce": nonce}
+            )
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Only {len(replies)}/{self.cluster_count - 1} clusters replied to {op!r}."
+            )
+        finally:
+            del self._requests[nonce]
+
+        return replies
+
+
+def run_cluster(
+    cluster_id: int,
+    shard_ids: list[int],
+    shard_count: int,
+    cluster_count: int,
+    conn: Connection,
+) -> None:
+    """
+    The entrypoint of a cluster process.
+    """
+    import cogs._utils.library_override  # pyright: ignore[reportUnusedImport]
+
+    from .config import load_config
+    from .startup import StartupTimeline
+    from .subclasses import create_bot
+
+    timeline = StartupTimeline()
+    with timeline.phase("config"):
+        config = load_config("Config.toml")
+
+    bot = create_bot(
+        config,
+        timeline=timeline,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        cluster=ClusterClient(conn, cluster_id, cluster_count),
+    )
+    bot.run(config["Bot"]["TOKEN"])
+
+
+class ClusterLauncher:
+    """
+    Runs groups of shards in separate processes and routes the IPC messages between them.
+
+    Clusters that exit are restarted, unless the launcher is shutting down.
+    """
+
+    def __init__(
+        self,
+        *,
+        shard_count: int,
+        clusters: int,
+        restart_delay: float = 5.0,
+    ) -> None:
+        self.shard_count = shard_count
+        self.groups = shard_groups(shard_count, clusters)
+        self.restart_delay = restart_delay
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: dict[int, BaseProcess] = {}
+        self._conns: dict[int, Connection] = {}
+        # Mapping of CLUSTER_ID: MONOTONIC_DEADLINE of the clusters waiting to be restarted.
+        self._restarts: dict[int, float] = {}
+        self._closing = False
+
+    def spawn(self, cluster_id: int) -> None:
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=run_cluster,
+            args=(
+                cluster_id,
+                self.groups[cluster_id],
+                self.shard_count,
+                len(self.groups),
+                child,
+            ),
+            name=f"cluster-{cluster_id}",
+        )
+        process.start()
+        child.close()  # only the child uses it now.
+
+        self._processes[cluster_id] = process
+        self._conns[cluster_id] = parent
+        logger.info(
+            f"Started cluster {cluster_id} (pid {process.pid}) with shards {self.groups[cluster_id]}."
+        )
+
+    def _route(self, message: Message) -> None:
+        if message["op"] == "reply":
+            targets = [message["to"]]
+        else:
+            targets = [i for i in self._conns if i != message["origin"]]
+
+        for cluster_id in targets:
+            conn = self._conns.get(cluster_id)
+            if conn is None:
+                continue
+
+            try:
+                conn.send(message)
+            except OSError:
+                pass  # it died, its sentinel is handled by `run`.
+
+    def run(self) -> None:
+        for cluster_id in range(len(self.groups)):
+            self.spawn(cluster_id)
+
+        try:
+            while self._processes or self._restarts:
+                by_conn = {conn: i for i, conn in self._conns.items()}
+                by_sentinel = {p.sentinel: i for i, p in self._processes.items()}
+
+                # restarts are due in the same loop, so the other clusters keep being routed meanwhile.
+                timeout = None
+                if self._restarts:
+                    timeout = max(0.0, min(self._restarts.values()) - time.monotonic())
+
+                for ready in wait([*by_conn, *by_sentinel], timeout=timeout):
+                    if ready in by_conn:
+                        try:
+                            self._route(ready.recv())  # type: ignore
+                        except (EOFError, OSError):
+                            # it'd be ready (and fail) again on every pass otherwise.
+                            self._drop_conn(by_conn[ready])  # type: ignore
+                    elif ready in by_sentinel:
+                        self._on_exit(by_sentinel[ready])  # type: ignore
+
+                self._restart_due()
+        except KeyboardInterrupt:
+            self.close()
+
+    def _drop_conn(self, cluster_id: int) -> None:
+        conn = self._conns.pop(cluster_id, None)
+        if conn is None:
+            return
+
+        conn.close()
+        if (process := self._processes.get(cluster_id)) and process.is_alive():
+            logger.warning(
+                f"Cluster {cluster_id} closed its pipe but is still running, "
+                "it won't receive any IPC messages until it's restarted."
+            )
+
+    def _on_exit(self, cluster_id: int) -> None:
+        process = self._processes.pop(cluster_id)
+        self._drop_conn(cluster_id)
+
+        if self._closing:
+            return
+
+        logger.warning(
+            f"Cluster {cluster_id} exited with code {process.exitcode}, "
+            f"restarting it in {self.restart_delay}s."
+        )
+        self._restarts[cluster_id] = time.monotonic() + self.restart_delay
+
+    def _restart_due(self) -> None:
+        now = time.monotonic()
+        for cluster_id, deadline in list(self._restarts.items()):
+            if deadline <= now and not self._closing:
+                del self._restarts[cluster_id]
+                self.spawn(cluster_id)
+
+    def close(self) -> None:
+        self._closing = True
+        self._restarts.clear()
+        for process in self._processes.values():
+            process.terminate()
+
+        for process in self._processes.values():
+            process.join(timeout=10)
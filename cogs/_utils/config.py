@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import os
+import stat
+import toml
+import asyncio
+import logging
+import tempfile
+
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from typing import Any, Mapping, Optional, Self
+
+
+logger = logging.getLogger("discord")
+
+
+def load_config(path: str = "Config.toml") -> dict[str, Any]:
+    with open(path) as f:
+        return toml.load(f)
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})  # type: ignore
+
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)  # type: ignore
+
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class Endpoints:
+    """
+    The base URLs of the third party services the bot talks to, from `Bot.Endpoints`.
+
+    They default to the real services, pointing them at `dev/fake_upstream` lets
+    everything run (and be benchmarked) offline.
+    """
+
+    anilist: str = "https://graphql.anilist.co"
+    spotify_api: str = "https://api-partner.spotify.com"
+    spotify_open: str = "https://open.spotify.com"
+    pokemon_csv: str = (
+        "https://raw.githubusercontent.com/poketwo/data/master/csv/pokemon.csv"
+    )
+    discord_cdn: str = "https://cdn.discordapp.com"
+
+    @classmethod
+    def from_dict(cls, config: Mapping[str, str]) -> Self:
+        known = cls.__dataclass_fields__
+        for key in config:
+            if key.lower() not in known:
+                expected = ", ".join(name.upper() for name in known)
+                raise ValueError(
+                    f"Unknown endpoint `Bot.Endpoints.{key}`, expected one of {expected}."
+                )
+
+        return cls(**{k.lower(): v.rstrip("/") for k, v in config.items()})
+
+
+# the real services, everything else defaults to these rather than its own copy of the URLs.
+DEFAULT_ENDPOINTS = Endpoints()
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """
+    An immutable, already parsed view of `Config.toml`.
+
+    Values that used to be parsed on every use (like the embed color) are
+    computed once here, a reload builds a new snapshot and swaps it in.
+    """
+
+    raw: Mapping[str, Any]
+    color: int
+    default_prefix: str
+    is_dev: bool
+    source_url: str
+    branch: str
+    emojis: Mapping[str, str]
+    cogs: Mapping[str, Mapping[str, Any]]
+    endpoints: Endpoints
+
+    @classmethod
+    def from_dict(cls, config: dict[str, Any]) -> Self:
+        raw: Mapping[str, Any] = freeze(config)
+        bot = raw["Bot"]
+
+        return cls(
+            raw=raw,
+            color=int(bot["DEFAULT_COLOR"], 16),
+            default_prefix=bot["DEFAULT_PREFIX"],
+            is_dev=bot["IS_DEV"],
+            source_url=bot["SOURCE_URL"],
+            branch=bot["BRANCH"],
+            emojis=bot.get("Emojis", MappingProxyType({})),
+            cogs=raw.get("Cogs", MappingProxyType({})),
+            endpoints=Endpoints.from_dict(bot.get("Endpoints", {})),
+        )
+
+    def cog(self, name: str) -> Optional[Mapping[str, Any]]:
+        return self.cogs.get(name)
+
+
+def atomic_write(path: str, data: str) -> None:
+    """
+    Writes `data` to a temporary file next to `path` and renames it over `path`,
+    so a crash mid-write can never leave a half written file behind.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # `mkstemp` creates it as 0600, which the rename would give to `path`.
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ConfigWriter:
+    """
+    Persists the config off the event loop.
+
+    Saves requested while a write is in flight are merged into a single
+    follow-up write of the latest config, the returned future resolves
+    once the write that includes that save is on disk.
+    """
+
+    def __init__(self, path: str = "Config.toml") -> None:
+        self.path = path
+
+        self._config: dict[str, Any] = {}
+        self._pending: Optional[asyncio.Future[None]] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def save(self, config: dict[str, Any]) -> asyncio.Future[None]:
+        self._config = config
+
+        if self._pending is None:
+            self._pending = asyncio.get_running_loop().create_future()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        return self._pending
+
+    async def _run(self) -> None:
+        while self._pending is not None:
+            future, self._pending = self._pending, None
+
+            # serialized on the loop so the snapshot is consistent, only the I/O is offloaded.
+            data = toml.dumps(self._config)
+
+            try:
+                await asyncio.to_thread(atomic_write, self.path, data)
+            except Exception as error:
+                logger.exception(f"Failed to write {self.path}:")
+                future.set_exception(error)
+            else:
+                logger.info(f"dumped config to {self.path}.")
+                future.set_result(None)
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import re
+import sys
+import asyncio
+import asyncpg
+import hashlib
+import logging
+import functools
+
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from .metrics import DB_ACQUIRE_WAIT, DB_QUERY_LATENCY
+
+from typing import Any, AsyncGenerator, Callable, Mapping, Optional
+
+
+logger = logging.getLogger("discord")
+
+# the (COG, COMMAND) of the command being invoked, set by `Bot.invoke`.
+invocation: ContextVar[Optional[tuple[str, str]]] = ContextVar(
+    "invocation", default=None
+)
+
+LITERALS_RE = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# arguments bigger than this (like the arrays of a bulk insert) aren't kept for `EXPLAIN`.
+MAX_KEPT_ARG = 1024
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize(query: str) -> str:
+    """
+    Collapses whitespace and replaces inline literals with `?`, so the same statement is grouped together.
+    """
+    return LITERALS_RE.sub("?", WHITESPACE_RE.sub(" ", query).strip())
+
+
+def row_count(method: str, result: Any) -> int:
+    if method == "execute":
+        # the status looks like `INSERT 0 5` or `UPDATE 5`.
+        count = result.rsplit(" ", 1)[-1]
+        return int(count) if count.isdigit() else 0
+
+    if method == "fetch":
+        return len(result)
+
+    if method == "executemany":  # doesn't return anything to count.
+        return 0
+
+    return int(result is not None)
+
+
+def query_caller() -> str:
+    """
+    Returns where a query came from, the invoked command if there's one or the calling cog module.
+    """
+    if current := invocation.get():
+        cog, command = current
+        return f"{cog} ({command})"
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        module: str = frame.f_globals.get("__name__", "")
+        if module.startswith("cogs.") and not module.startswith("cogs._utils.database"):
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+
+    return "unknown"
+
+
+class PoolStats:
+    """
+    Live statistics on how long acquiring a connection takes and how busy the pool is.
+    """
+
+    def __init__(self, *, window: int = 1000) -> None:
+        self.acquires = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.recent_waits: deque[float] = deque(maxlen=window)
+
+    def record_wait(self, wait: float) -> None:
+        self.acquires += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+        DB_ACQUIRE_WAIT.observe(wait)
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.acquires if self.acquires else 0.0
+
+    def percentile_wait(self, percentile: float) -> float:
+        if not self.recent_waits:
+            return 0.0
+
+        waits = sorted(self.recent_waits)
+        return waits[min(len(waits) - 1, int(len(waits) * percentile))]
+
+
+def keepable(args: tuple[Any, ...]) -> Optional[tuple[Any, ...]]:
+    """
+    Returns `args` if none of them are too large to keep around, otherwise None.
+    """
+    for arg in args:
+        if isinstance(arg, (str, bytes, list, tuple)) and len(arg) > MAX_KEPT_ARG:
+            return None
+
+    return args
+
+
+class QueryStats:
+    # fmt: off
+    __slots__ = ("id", "query", "calls", "errors", "rows", "total_time", "max_time", "last_query", "last_args")
+    # fmt: on
+
+    def __init__(self, query: str) -> None:
+        self.id = hashlib.sha1(query.encode()).hexdigest()[:8]
+        self.query = query
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        # kept so a statement can be `EXPLAIN`ed as it was actually run,
+        # None when the arguments were too large to keep around.
+        self.last_query = query
+        self.last_args: Optional[tuple[Any, ...]] = ()
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class QueryLog:
+    """
+    Per-statement latency and row counts, with a log of the queries slower than `threshold`.
+    """
+
+    def __init__(self, *, threshold: float = 0.25, max_statements: int = 500) -> None:
+        self.threshold = threshold
+        self.max_statements = max_statements
+        # in least to most recently run order, so the one to evict is always first.
+        self.statements: OrderedDict[str, QueryStats] = OrderedDict()
+
+    def record(
+        self,
+        query: str,
+        args: tuple[Any, ...],
+        elapsed: float,
+        *,
+        rows: int = 0,
+        failed: bool = False,
+    ) -> None:
+        normalized = normalize(query)
+        stats = self.statements.get(normalized)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                # dynamic SQL shouldn't be able to grow this forever, drop the least recently run statement.
+                self.statements.popitem(last=False)
+
+            stats = self.statements[normalized] = QueryStats(normalized)
+        else:
+            self.statements.move_to_end(normalized)
+
+        stats.calls += 1
+        stats.errors += failed
+        stats.rows += rows
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        stats.last_query, stats.last_args = query, keepable(args)
+
+        if elapsed >= self.threshold:
+            logger.warning(
+                f"Slow query ({elapsed * 1000:.2f}ms, {rows} rows) "
+                f"from {query_caller()} [{stats.id}]: {normalized[:500]}"
+            )
+
+    def top(self, amount: int = 10) -> list[QueryStats]:
+        return sorted(
+            self.statements.values(), key=lambda s: s.total_time, reverse=True
+        )[:amount]
+
+    def find(self, statement_id: str) -> Optional[QueryStats]:
+        return next((s for s in self.statements.values() if s.id == statement_id), None)
+
+
+class Database:
+    """
+    A thin wrapper around `asyncpg.Pool` with the same query methods, that also
+    keeps `PoolStats` and optional per-cog concurrency budgets.
+
+    A budget caps how many connections one name (usually a cog) can hold at
+    once, so a backlog of background writes can't take up the whole pool.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        *,
+        max_size: int,
+        budgets: Optional[Mapping[str, int]] = None,
+        slow_query_threshold: float = 0.25,
+    ) -> None:
+        self.pool = pool
+        self.max_size = max_size
+        self.stats = PoolStats()
+        self.queries = QueryLog(threshold=slow_query_threshold)
+
+        self.budgets = {
+            name: asyncio.Semaphore(limit) for name, limit in (budgets or {}).items()
+        }
+        self.budget_limits = dict(budgets or {})
+        self.budget_in_use = {name: 0 for name in self.budgets}
+
+    @classmethod
+    async def create(cls, dsn: str, config: Mapping[str, Any]) -> Database:
+        max_size = config.get("MAX_SIZE", 10)
+
+        pool = await asyncpg.create_pool(
+            dsn,
+            min_size=config.get("MIN_SIZE", 1),
+            max_size=max_size,
+            max_inactive_connection_lifetime=config.get(
+                "MAX_INACTIVE_CONNECTION_LIFETIME", 300.0
+            ),
+            command_timeout=config.get("COMMAND_TIMEOUT", 60.0),
+            statement_cache_size=config.get("STATEMENT_CACHE_SIZE", 100),
+            max_cached_statement_lifetime=config.get(
+                "MAX_CACHED_STATEMENT_LIFETIME", 300
+            ),
+        )
+        if pool is None:
+            raise RuntimeError("Could not connect to the DATABASE")
+
+        return cls(
+            pool,
+            max_size=max_size,
+            budgets=config.get("Budgets"),
+            slow_query_threshold=config.get("SLOW_QUERY_THRESHOLD", 0.25),
+        )
+
+    @property
+    def saturation(self) -> float:
+        return self.stats.in_use / self.max_size
+
+    @asynccontextmanager
+    async def budget(self, name: Optional[str]) -> AsyncGenerator[None, None]:
+        if name is None or name not in self.budgets:
+            yield
+            return
+
+        async with self.budgets[name]:
+            self.budget_in_use[name] += 1
+            try:
+                yield
+            finally:
+                self.budget_in_use[name] -= 1
+
+    @asynccontextmanager
+    async def acquire(
+        self, *, budget: Optional[str] = None
+    ) -> AsyncGenerator[asyncpg.Connection, None]:
+        async with self.budget(budget):
+            self.stats.waiting += 1
+            start = perf_counter()
+            try:
+                conn: asyncpg.Connection = await self.pool.acquire()
+            finally:
+                self.stats.waiting -= 1
+
+            self.stats.record_wait(perf_counter() - start)
+            self.stats.in_use += 1
+            self.stats.peak_in_use = max(self.stats.peak_in_use, self.stats.in_use)
+
+            try:
+                yield conn
+            finally:
+                self.stats.in_use -= 1
+                await self.pool.release(conn)
+
+    async def _query(
+        self, method: str, query: str, args: tuple[Any, ...], budget: Optional[str]
+    ) -> Any:
+        # `executemany` is passed a single list of argument tuples, not parameters,
+        # the first of which is kept as the sample it's `EXPLAIN`ed with.
+        params = args
+        if method == "executemany":
+            params = tuple(args[0][0]) if args[0] else ()
+
+        async with self.acquire(budget=budget) as conn:
+            call: Callable[..., Any] = getattr(conn, method)
+            start = perf_counter()
+            try:
+                result = await call(query, *args)
+            except Exception:
+                elapsed = perf_counter() - start
+                DB_QUERY_LATENCY.observe(elapsed, method=method)
+                self.queries.record(query, params, elapsed, failed=True)
+                raise
+
+            elapsed = perf_counter() - start
+            DB_QUERY_LATENCY.observe(elapsed, method=method)
+            self.queries.record(query, params, elapsed, rows=row_count(method, result))
+            return result
+
+    async def execute(
+        self, query: str, *args: Any, budget: Optional[str] = None
+    ) -> str:
+        return await self._query("execute", query, args, budget)
+
+    async def executemany(
+        self, query: str, args: Any, *, budget: Optional[str] = None
+    ) -> None:
+        await self._query("executemany", query, (list(args),), budget)
+
+    async def fetch(
+        self, query: str, *args: Any, budget: Optional[str] = None
+    ) -> list[asyncpg.Record]:
+        return await self._query("fetch", query, args, budget)
+
+    async def fetchrow(
+        self, query: str, *args: Any, budget: Optional[str] = None
+    ) -> Optional[asyncpg.Record]:
+        return await self._query("fetchrow", query, args, budget)
+
+    async def fetchval(
+        self, query: str, *args: Any, budget: Optional[str] = None
+    ) -> Any:
+        return await self._query("fetchval", query, args, budget)
+
+    async def explain(self, query: str, *args: Any) -> str:
+        """
+        Runs `EXPLAIN ANALYZE` on `query` inside a transaction that's always rolled back,
+        so statements that write can be explained without changing anything.
+        """
+        async with self.acquire() as conn:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args)
+            finally:
+                await transaction.rollback()
+
+        return "\n".join(row[0] for row in rows)
+
+    async def close(self) -> None:
+        await self.pool.close()
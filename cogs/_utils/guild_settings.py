@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from cachetools import LRUCache
+
+from typing import TYPE_CHECKING, Any, Optional, TypedDict
+
+if TYPE_CHECKING:
+    from .subclasses import Bot
+
+
+logger = logging.getLogger("discord")
+
+FETCH_QUERY = """
+SELECT prefix, disabled_modules
+    FROM guild_settings
+WHERE guild_id = $1;
+"""
+
+INSERT_QUERY = """
+INSERT INTO guild_settings (guild_id, prefix)
+    SELECT * FROM UNNEST($1::BIGINT[], $2::TEXT[])
+ON CONFLICT (guild_id) DO NOTHING;
+"""
+
+SET_PREFIX_QUERY = """
+INSERT INTO guild_settings (guild_id, prefix)
+    VALUES ($1, $2)
+ON CONFLICT (guild_id) DO UPDATE
+    SET prefix = EXCLUDED.prefix
+RETURNING prefix, disabled_modules;
+"""
+
+ENABLE_MODULE_QUERY = """
+INSERT INTO guild_settings (guild_id, prefix)
+    VALUES ($1, $2)
+ON CONFLICT (guild_id) DO UPDATE
+    SET disabled_modules = ARRAY_REMOVE(guild_settings.disabled_modules, $3)
+RETURNING prefix, disabled_modules;
+"""
+
+DISABLE_MODULE_QUERY = """
+INSERT INTO guild_settings (guild_id, prefix, disabled_modules)
+    VALUES ($1, $2, ARRAY[$3])
+ON CONFLICT (guild_id) DO UPDATE
+    SET disabled_modules = ARRAY_APPEND(guild_settings.disabled_modules, $3)
+RETURNING prefix, disabled_modules;
+"""
+
+
+class GuildConfig(TypedDict):
+    prefix: str
+    disabled_modules: list[str]
+
+
+class GuildSettings:
+    """
+    A lazily loaded, size-capped cache of the `guild_settings` table.
+
+    A guild's row is fetched in a single query the first time it's needed,
+    concurrent misses for the same guild share that query, and the least
+    recently used guilds are evicted once `max_size` is reached. Guilds
+    without a row get the defaults, and their row is created in batches
+    by a write-behind task.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        max_size: int = 10_000,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.bot = bot
+        self.flush_interval = flush_interval
+
+        self._cache: LRUCache[int, GuildConfig] = LRUCache(maxsize=max_size)
+        self._loading: dict[int, asyncio.Future[GuildConfig]] = {}
+        self._pending: dict[int, str] = {}
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def default_prefix(self) -> str:
+        return self.bot.snapshot.default_prefix
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get_cached(self, guild_id: int) -> Optional[GuildConfig]:
+        return self._cache.get(guild_id)
+
+    async def get(self, guild_id: int) -> GuildConfig:
+        """
+        Returns the settings of a guild, loading them if they aren't cached.
+        """
+        config = self._cache.get(guild_id)
+        if config is not None:
+            return config
+
+        future = self._loading.get(guild_id)
+        if future is None:
+            future = self._loading[guild_id] = asyncio.ensure_future(
+                self._load(guild_id)
+            )
+            future.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+
+        return await asyncio.shield(future)
+
+    async def _load(self, guild_id: int) -> GuildConfig:
+        record = await self.bot.pool.fetchrow(FETCH_QUERY, guild_id)
+
+        if record is None:
+            config: GuildConfig = {
+                "prefix": self.default_prefix,
+                "disabled_modules": [],
+            }
+            self._pending[guild_id] = config["prefix"]
+        else:
+            config = {
+                "prefix": record["prefix"],
+                "disabled_modules": record["disabled_modules"] or [],
+            }
+
+        self._cache[guild_id] = config
+        return config
+
+    def invalidate(self, guild_id: int) -> None:
+        self._cache.pop(guild_id, None)
+
+    async def get_prefix(self, guild_id: int) -> str:
+        return (await self.get(guild_id))["prefix"]
+
+    async def set_prefix(self, guild_id: int, prefix: str) -> None:
+        record = await self.bot.pool.fetchrow(SET_PREFIX_QUERY, guild_id, prefix)
+        self._store(guild_id, record)
+
+    async def disabled_modules(self, guild_id: int) -> list[str]:
+        return (await self.get(guild_id))["disabled_modules"]
+
+    async def is_disabled(self, guild_id: int, module: str) -> bool:
+        return module in await self.disabled_modules(guild_id)
+
+    async def enable_module(self, guild_id: int, module: str) -> list[str]:
+        record = await self.bot.pool.fetchrow(
+            ENABLE_MODULE_QUERY, guild_id, self.default_prefix, module
+        )
+        return self._store(guild_id, record)["disabled_modules"]
+
+    async def disable_module(self, guild_id: int, module: str) -> list[str]:
+        record = await self.bot.pool.fetchrow(
+            DISABLE_MODULE_QUERY, guild_id, self.default_prefix, module
+        )
+        return self._store(guild_id, record)["disabled_modules"]
+
+    def _store(self, guild_id: int, record: Any) -> GuildConfig:
+        self._pending.pop(guild_id, None)  # the row exists now.
+
+        config: GuildConfig = {
+            "prefix": record["prefix"],
+            "disabled_modules": record["disabled_modules"] or [],
+        }
+        self._cache[guild_id] = config
+
+        if self.bot.cluster is not None:  # other clusters might have it cached too.
+            self.bot.cluster.broadcast("invalidate_guild", guild_id)
+
+        return config
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Creates the rows of every new guild seen since the last flush in a single query.
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+
+        try:
+            await self.bot.pool.execute(
+                INSERT_QUERY,
+                list(pending.keys()),
+                list(pending.values()),
+                budget="GuildSettings",
+            )
+        except Exception:
+            logger.exception(f"Failed to create {len(pending)} guild settings row(s):")
+            for guild_id, prefix in pending.items():  # try again on the next flush.
+                self._pending.setdefault(guild_id, prefix)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.flush()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import discord
+
+from dataclasses import dataclass
+
+from typing import Any, Literal, Mapping, Optional, Union
+
+
+ChunkingStrategy = Literal["eager", "lazy", "never"]
+CHUNKING_STRATEGIES = ("eager", "lazy", "never")
+
+
+class IncompatibleCachePolicy(Exception):
+    """
+    Raised when the intents and cache settings can't work together,
+    or don't give a cog what it needs.
+    """
+
+    def __init__(self, problems: list[str]) -> None:
+        self.problems = problems
+        super().__init__("\n".join(f"- {problem}" for problem in problems))
+
+
+@dataclass(frozen=True)
+class Requirements:
+    """
+    What a cog needs from the gateway and the cache, declared as `BaseCog.REQUIREMENTS`.
+    """
+
+    intents: tuple[str, ...] = ()
+    member_cache: tuple[str, ...] = ()
+    # the chunking strategies the cog works with, empty if it doesn't care.
+    chunking: tuple[ChunkingStrategy, ...] = ()
+    message_cache: bool = False
+
+
+def _flags(
+    cls: Union[type[discord.Intents], type[discord.MemberCacheFlags]],
+    value: Union[str, list[str]],
+    problems: list[str],
+) -> Any:
+    if isinstance(value, str):
+        factory = getattr(cls, value, None)
+        if value not in ("all", "none", "default") or factory is None:
+            problems.append(f"{value!r} isn't a valid preset for {cls.__name__}.")
+            return cls.none()
+
+        return factory()
+
+    flags = cls.none()
+    for name in value:
+        if name not in cls.VALID_FLAGS:
+            problems.append(f"{name!r} isn't a valid {cls.__name__} flag.")
+            continue
+
+        setattr(flags, name, True)
+
+    return flags
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    The intents, member cache, chunking and message cache the bot runs with, from `Bot.Cache`.
+
+    Configs without a `Bot.Cache` section get what the bot always used, every intent
+    with the default member cache and every guild chunked at startup.
+    """
+
+    intents: discord.Intents
+    member_cache: discord.MemberCacheFlags
+    chunking: ChunkingStrategy
+    max_messages: Optional[int]
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> CachePolicy:
+        """
+        Builds the policy, raising `IncompatibleCachePolicy` if it can't work.
+        """
+        problems: list[str] = []
+        cache = config["Bot"].get("Cache", {})
+
+        intents: discord.Intents = _flags(
+            discord.Intents, cache.get("INTENTS", "all"), problems
+        )
+        for name, enabled in cache.get("Intents", {}).items():
+            if name not in discord.Intents.VALID_FLAGS:
+                problems.append(f"{name!r} isn't a valid Intents flag.")
+                continue
+
+            setattr(intents, name, enabled)
+
+        member_cache = cache.get("MEMBER_CACHE", "from_intents")
+        if member_cache == "from_intents":
+            member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        else:
+            member_cache_flags = _flags(
+                discord.MemberCacheFlags, member_cache, problems
+            )
+
+        chunking = cache.get("CHUNKING", "eager")
+        if chunking not in CHUNKING_STRATEGIES:
+            strategies = ", ".join(CHUNKING_STRATEGIES)
+            problems.append(f"CHUNKING must be one of {strategies}, not {chunking!r}.")
+
+        max_messages = cache.get("MAX_MESSAGES", 1000)
+
+        policy = cls(intents, member_cache_flags, chunking, max_messages or None)
+        problems.extend(policy.validate())
+        if problems:
+            raise IncompatibleCachePolicy(problems)
+
+        return policy
+
+    def validate(self) -> list[str]:
+        problems: list[str] = []
+
+        if self.member_cache.joined and not self.intents.members:
+            problems.append("the `joined` member cache needs the `members` intent.")
+
+        if self.member_cache.voice and not self.intents.voice_states:
+            problems.append("the `voice` member cache needs the `voice_states` intent.")
+
+        if self.chunking != "never" and not self.intents.members:
+            problems.append(f"{self.chunking} chunking needs the `members` intent.")
+
+        if self.chunking != "never" and not self.member_cache.joined:
+            problems.append(
+                f"{self.chunking} chunking needs the `joined` member cache, "
+                "the chunked members would be thrown away otherwise."
+            )
+
+        return problems
+
+    def check(self, requirements: Requirements) -> list[str]:
+        """
+        Returns everything in `requirements` this policy doesn't provide.
+        """
+        problems = [
+            f"needs the `{name}` intent."
+            for name in requirements.intents
+            if not getattr(self.intents, name)
+        ]
+        problems.extend(
+            f"needs the `{name}` member cache."
+            for name in requirements.member_cache
+            if not getattr(self.member_cache, name)
+        )
+
+        if requirements.chunking and self.chunking not in requirements.chunking:
+            problems.append(
+                f"needs {' or '.join(requirements.chunking)} chunking, not {self.chunking}."
+            )
+
+        if requirements.message_cache and not self.max_messages:
+            problems.append("needs the message cache (MAX_MESSAGES).")
+
+        return problems
+
+    @property
+    def chunk_at_startup(self) -> bool:
+        return self.chunking == "eager"
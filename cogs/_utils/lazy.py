@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+import importlib
+
+from time import perf_counter
+from types import ModuleType
+
+from typing import Any, Optional
+
+
+# Mapping of MODULE_NAME: (OWNER, SECONDS_TAKEN)
+IMPORT_COSTS: dict[str, tuple[str, float]] = {}
+
+
+def timed_import(name: str, *, owner: str) -> ModuleType:
+    """
+    Imports a module and records how long the import took against `owner` (usually a cog name).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    start = perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_COSTS.setdefault(name, (owner, perf_counter() - start))
+
+    return module
+
+
+def import_cost_report() -> str:
+    per_owner: dict[str, float] = {}
+    for owner, took in IMPORT_COSTS.values():
+        per_owner[owner] = per_owner.get(owner, 0) + took
+
+    lines = ["Import costs:"]
+    for owner, took in sorted(per_owner.items(), key=lambda item: -item[1]):
+        modules = ", ".join(
+            f"{name} ({cost:.2f}s)"
+            for name, (module_owner, cost) in IMPORT_COSTS.items()
+            if module_owner == owner
+        )
+        lines.append(f"  {owner}: {took:.2f}s - {modules}")
+
+    return "\n".join(lines)
+
+
+class LazyModule:
+    """
+    A stand-in for a module that's only imported on first attribute access.
+    """
+
+    def __init__(self, name: str, *, owner: str) -> None:
+        self.__name = name
+        self.__owner = owner
+        self.__module: Optional[ModuleType] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.__module is not None
+
+    def load(self) -> ModuleType:
+        if self.__module is None:
+            self.__module = timed_import(self.__name, owner=self.__owner)
+
+        return self.__module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyModule {self.__name!r} loaded={self.loaded}>"
@@ -1,9 +1,19 @@
 import re
 import discord
 
+from functools import cached_property
+
+from .scanner import ScanResult, scanner
+
 from typing import Any, List
 
 
+CUSTOM_EMOJI_RE = re.compile(
+    r"<(?P<animated>a?):(?P<name>[a-zA-Z0-9_]{2,32}):(?P<id>[0-9]{18,22})>"
+)
+scanner.register("custom_emoji", CUSTOM_EMOJI_RE, mode="finditer", contains="<")
+
+
 class KanaMessage(discord.Message):
     async def edit(self, *args: Any, **kwargs: Any) -> discord.Message:
         embed = kwargs.get("embed")
@@ -16,6 +26,17 @@ class KanaMessage(discord.Message):
 
         return await super().edit(*args, **kwargs)
 
+    def _update(self, data: Any) -> None:
+        self.__dict__.pop("scan", None)  # the content might've changed.
+        super()._update(data)
+
+    @cached_property
+    def scan(self) -> ScanResult:
+        """
+        Every `MessageScanner` pattern hit in the message, scanned once on first access.
+        """
+        return scanner.scan(self)
+
     @property
     def custom_emojis(self) -> List[discord.PartialEmoji]:
         """
@@ -26,13 +47,13 @@ class KanaMessage(discord.Message):
         List[discord.PartialEmoji]
             A list of `PartialEmoji`s in the message.
         """
-        emojis = re.findall(
-            "<(?P<animated>a?):(?P<name>[a-zA-Z0-9_]{2,32}):(?P<id>[0-9]{18,22})>",
-            self.content,
-        )
         return [
-            discord.PartialEmoji(animated=bool(animated), name=name, id=id)
-            for animated, name, id in emojis
+            discord.PartialEmoji(
+                animated=bool(match["animated"]),
+                name=match["name"],
+                id=int(match["id"]),
+            )
+            for match in self.scan.all("custom_emoji")
         ]
 
 
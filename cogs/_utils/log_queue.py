@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+
+from collections import deque
+from logging.handlers import QueueHandler
+
+from typing import Literal, Optional
+
+
+OverflowPolicy = Literal["drop_oldest", "drop_debug", "block"]
+
+
+class LogQueue:
+    """
+    A bounded, thread-safe hand-off of log records from any thread to the event loop.
+
+    `put_nowait` can be called from any thread (it's what `QueueHandler` calls),
+    `get` must be awaited from the bound loop. When the queue is full the
+    `policy` decides what happens:
+
+    - `drop_oldest`: the oldest record is dropped.
+    - `drop_debug`: the oldest record of the lowest level is dropped, if the new
+       record is of a lower level than everything queued, it's dropped itself.
+    - `block`: threads other than the loop's wait for room in `wait_for_room`,
+       for up to `block_timeout` seconds, then the oldest record is dropped.
+
+    `put_nowait` itself never waits, it's called with the handler's lock held, so a
+    thread waiting there would block the loop as soon as the loop logs anything.
+    That's why the waiting is done by `LogQueueHandler`, before it takes the lock.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        policy: OverflowPolicy = "drop_oldest",
+        *,
+        block_timeout: float = 1.0,
+    ):
+        self.maxsize = maxsize
+        self.policy: OverflowPolicy = policy
+        self.block_timeout = block_timeout
+
+        self.queued = 0
+        self.dropped = 0
+        self.dropped_by_level: dict[str, int] = {}
+
+        self._records: deque[logging.LogRecord] = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._waiter: Optional[asyncio.Future[None]] = None
+
+    def configure(
+        self, *, maxsize: Optional[int] = None, policy: Optional[OverflowPolicy] = None
+    ) -> None:
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if policy is not None:
+                self.policy = policy
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Binds the queue to the loop `get` is awaited from, called from that loop's thread.
+        """
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def qsize(self) -> int:
+        return len(self._records)
+
+    def _drop(self, record: logging.LogRecord) -> None:
+        self.dropped += 1
+        self.dropped_by_level[record.levelname] = (
+            self.dropped_by_level.get(record.levelname, 0) + 1
+        )
+
+    def _make_room(self, record: logging.LogRecord) -> bool:
+        """
+        Drops a record according to the policy, returns False if `record` itself should be dropped.
+        """
+        if self.policy == "drop_debug":
+            lowest = min(self._records, key=lambda queued: queued.levelno)
+            if record.levelno < lowest.levelno:
+                return False
+
+            self._records.remove(lowest)
+            self._drop(lowest)
+            return True
+
+        self._drop(self._records.popleft())
+        return True
+
+    def wait_for_room(self) -> None:
+        """
+        Waits for the queue to have room under the `block` policy, unless called from
+        the loop's own thread (the only one draining it). Gives up after `block_timeout`.
+        """
+        loop = self._loop
+        if (
+            self.policy != "block"
+            or loop is None
+            or loop.is_closed()
+            or threading.get_ident() == self._loop_thread
+        ):
+            return
+
+        with self._not_full:
+            self._not_full.wait_for(
+                lambda: len(self._records) < self.maxsize, self.block_timeout
+            )
+
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        with self._lock:
+            if len(self._records) >= self.maxsize and not self._make_room(record):
+                self._drop(record)
+                return
+
+            self._records.append(record)
+            self.queued += 1
+
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        if threading.get_ident() == self._loop_thread:
+            self._set_waiter()
+        else:
+            loop.call_soon_threadsafe(self._set_waiter)
+
+    def _set_waiter(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def get_nowait(self) -> logging.LogRecord:
+        """
+        Returns the oldest record, raising `asyncio.QueueEmpty` if there's none.
+        """
+        with self._lock:
+            if not self._records:
+                raise asyncio.QueueEmpty
+
+            self._not_full.notify_all()
+            return self._records.popleft()
+
+    async def get(self) -> logging.LogRecord:
+        while True:
+            with self._lock:
+                if self._records:
+                    self._not_full.notify_all()
+                    return self._records.popleft()
+
+                self._waiter = asyncio.get_running_loop().create_future()
+
+            await self._waiter
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    A `QueueHandler` that waits for room in its `LogQueue` before taking the handler's lock.
+    """
+
+    queue: LogQueue
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        self.queue.wait_for_room()
+        return super().handle(record)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from . import cutoff
+from .webhooks import RateLimitedWebhook
+
+from typing import Any, Optional
+
+
+logger = logging.getLogger("discord")
+# the shipper's own failures, outside of "discord" so they aren't shipped (and failing) again.
+shipper_logger = logging.getLogger(__name__)
+
+CONTENT_LIMIT = 2000
+
+avatar = lambda avatar_id: f"https://cdn.discordapp.com/embed/avatars/{avatar_id}.png"  # type: ignore
+
+# fmt: off
+# Mapping of ERROR_NO: (USERNAME, AVATAR)
+ERROR_TYPE_MAPPING = {
+    50: ("CRITICAL", avatar(4)), # red
+    40: ("ERROR",    avatar(4)), # red
+    30: ("WARNING",  avatar(3)), # yellow
+    20: ("INFO",     avatar(1)), # grey
+    10: ("DEBUG",    avatar(1)), # grey
+     0: ("NOTSET",   avatar(1)), # grey
+}
+# fmt: on
+
+
+class LogShipper:
+    """
+    Ships log records to a webhook in batches.
+
+    Records are buffered until `CONTENT_LIMIT` worth of text is waiting or
+    `flush_interval` seconds have passed since the first one, consecutive
+    records of the same level are then packed into a single message. Anything
+    that doesn't fit in one message is sent as a `log.txt` attachment instead
+    of being split into chunks.
+    """
+
+    def __init__(
+        self,
+        webhook: RateLimitedWebhook,
+        queue: Any,
+        *,
+        flush_interval: float = 2.0,
+    ) -> None:
+        self.webhook = webhook
+        self.queue = queue
+        self.flush_interval = flush_interval
+
+        # collected (and then packed) but not shipped yet, kept so `close` can still ship them.
+        self._records: list[logging.LogRecord] = []
+        self._packed: list[tuple[int, str]] = []
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self, *, timeout: float = 10.0) -> None:
+        """
+        Stops shipping, then ships what's still buffered or queued, for up to `timeout` seconds.
+        """
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        while True:
+            try:
+                self._records.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            shipper_logger.warning(
+                f"Gave up on shipping {len(self._packed)} log message(s) at shutdown."
+            )
+
+    async def collect(self) -> list[logging.LogRecord]:
+        records = self._records
+        records.append(await self.queue.get())
+        size = len(records[0].getMessage())
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while size < CONTENT_LIMIT:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                record = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            records.append(record)
+            size += len(record.getMessage()) + 1
+
+        return records
+
+    def pack(self, records: list[logging.LogRecord]) -> list[tuple[int, str]]:
+        """
+        Groups consecutive records of the same level, returns a list of (LEVEL, TEXT).
+        """
+        packed: list[tuple[int, list[str]]] = []
+        for record in records:
+            if packed and packed[-1][0] == record.levelno:
+                packed[-1][1].append(record.getMessage())
+            else:
+                packed.append((record.levelno, [record.getMessage()]))
+
+        return [(level, "\n".join(messages)) for level, messages in packed]
+
+    async def ship(self, level: int, text: str) -> None:
+        name, avatar_url = ERROR_TYPE_MAPPING.get(level, ERROR_TYPE_MAPPING[0])
+
+        if len(text) <= CONTENT_LIMIT:
+            await self.webhook.send(text, username=name, avatar_url=avatar_url)
+            return
+
+        await self.webhook.send(
+            cutoff(text.partition("\n")[0], CONTENT_LIMIT),
+            username=name,
+            avatar_url=avatar_url,
+            files=[("log.txt", text.encode())],
+        )
+
+    async def flush(self) -> None:
+        self._packed.extend(self.pack(self._records))
+        self._records = []
+
+        while self._packed:
+            level, text = self._packed[0]
+            try:
+                await self.ship(level, text)
+            except Exception as error:
+                shipper_logger.error(
+                    f"Failed to ship a {logging.getLevelName(level)} log message: {error!r}"
+                )
+
+            # only once it's done, if this is cancelled midway it's shipped again by `close`.
+            self._packed.pop(0)
+
+    async def run(self) -> None:
+        while True:
+            await self.collect()
+            await self.flush()
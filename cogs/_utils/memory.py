@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import sys
+import asyncio
+import tracemalloc
+
+import discord
+from discord.ext import commands
+
+from collections import deque
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from itertools import islice
+
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .subclasses import Bot
+
+# (NAME, COUNT, BYTES) of a single line of the breakdown.
+Usage = tuple[str, int, int]
+# (GUILD, MEMBERS, MESSAGES, BYTES)
+GuildUsage = tuple[str, int, int, int]
+
+# objects that are sized along with their attributes, everything else that isn't
+# a container (channels, roles, the connection state) is only sized shallowly.
+FOLLOWED: tuple[type, ...] = (
+    discord.Member,
+    discord.User,
+    discord.Message,
+    discord.Embed,
+    discord.Attachment,
+    discord.ui.View,
+    discord.ui.Item,
+)
+# long-lived objects that everything refers to, which are never counted as part of
+# whatever refers to them (a view holding the bot shouldn't count every cog's state).
+SHARED: tuple[type, ...] = (
+    discord.Client,
+    discord.Guild,
+    discord.Interaction,
+    commands.Cog,
+    commands.Context,
+)
+
+SAMPLE_SIZE = 50
+# the most objects a single `deep_size` visits, so nothing can walk the whole heap.
+MAX_OBJECTS = 5000
+
+
+def _followed(obj: Any) -> bool:
+    return isinstance(obj, FOLLOWED) or type(obj).__module__.startswith("cogs.")
+
+
+def _attributes(obj: Any) -> Iterable[Any]:
+    if hasattr(obj, "__dict__"):
+        yield vars(obj)
+
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                yield getattr(obj, slot)
+
+
+def deep_size(obj: Any, seen: Optional[set[int]] = None) -> int:
+    """
+    The size of `obj` and everything it holds, counting every object once per `seen`.
+
+    Containers are followed, as are the objects in `FOLLOWED` and the ones defined
+    in the cogs. `SHARED` objects aren't counted at all, anything else is only
+    counted shallowly. At most `MAX_OBJECTS` objects are visited.
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    visited = 0
+    stack = [obj]
+    while stack and visited < MAX_OBJECTS:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, SHARED):
+            continue
+
+        seen.add(id(current))
+        visited += 1
+        size += sys.getsizeof(current, 0)
+
+        if isinstance(current, (str, bytes, bytearray, int, float)):
+            continue
+        if isinstance(current, Mapping):
+            stack.extend(current.keys())  # type: ignore
+            stack.extend(current.values())  # type: ignore
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)  # type: ignore
+        elif _followed(current):
+            stack.extend(_attributes(current))
+
+    return size
+
+
+def sample(objects: Sequence[Any]) -> Sequence[Any]:
+    if len(objects) <= SAMPLE_SIZE:
+        return objects
+
+    return objects[:: len(objects) // SAMPLE_SIZE][:SAMPLE_SIZE]
+
+
+def estimate(
+    objects: Sequence[Any], seen: set[int], count: Optional[int] = None
+) -> int:
+    """
+    Estimates the size of `count` (defaults to all of `objects`) uniform objects from a sample of them.
+    """
+    count = len(objects) if count is None else count
+    sampled = sample(objects)
+    if not sampled:
+        return 0
+
+    return sum(deep_size(obj, seen) for obj in sampled) * count // len(sampled)
+
+
+def container_size(obj: Any, seen: Optional[set[int]] = None) -> int:
+    """
+    `deep_size`, but the contents of a large container are estimated from a sample.
+    """
+    seen = set() if seen is None else seen
+    if isinstance(obj, Mapping):
+        keys, values = list(obj.keys()), list(obj.values())  # type: ignore
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        keys, values = list(obj), []  # type: ignore
+    else:
+        return deep_size(obj, seen)
+
+    seen.add(id(obj))
+    return sys.getsizeof(obj, 0) + estimate(keys, seen) + estimate(values, seen)
+
+
+def roots(bot: Bot) -> set[int]:
+    """
+    The IDs of the bot, its connection state, its cogs and what they hold directly.
+    Anything that refers to those is referring to something shared.
+    """
+    owners: list[Any] = [bot, bot._connection, *bot.cogs.values()]  # type: ignore
+    ids = {id(owner) for owner in owners}
+    for owner in owners:
+        ids.update(id(value) for value in getattr(owner, "__dict__", {}).values())
+
+    return ids
+
+
+async def discord_usage(
+    bot: Bot, *, guilds: int = 10
+) -> tuple[list[Usage], list[GuildUsage]]:
+    """
+    Returns the usage of discord.py's caches overall, and the member and message caches
+    of the `guilds` biggest guilds. Users, members and messages are estimated from a sample.
+    """
+    state = bot._connection  # type: ignore
+    seen = roots(bot)
+
+    messages = list(bot.cached_messages)
+    users = list(state._users.values())
+
+    # a few members of a sample of the guilds, rather than a list of every member.
+    member_count = sum(len(guild._members) for guild in bot.guilds)
+    members = [
+        member
+        for guild in sample(bot.guilds)
+        for member in islice(guild._members.values(), SAMPLE_SIZE)
+    ]
+
+    overall: list[Usage] = [
+        ("guilds", len(bot.guilds), sum(sys.getsizeof(g, 0) for g in bot.guilds)),
+        ("users", len(users), estimate(users, seen)),
+        ("members", member_count, estimate(members, seen, member_count)),
+        ("messages", len(messages), estimate(messages, seen)),
+    ]
+    await asyncio.sleep(0)
+
+    by_guild: dict[int, list[discord.Message]] = {}
+    for message in messages:
+        if message.guild is not None:
+            by_guild.setdefault(message.guild.id, []).append(message)
+
+    biggest = sorted(bot.guilds, key=lambda g: len(g._members), reverse=True)[:guilds]
+    per_guild: list[GuildUsage] = []
+    for guild in biggest:
+        guild_members = list(guild._members.values())
+        guild_messages = by_guild.get(guild.id, [])
+        size = estimate(guild_members, set(seen)) + estimate(guild_messages, set(seen))
+        per_guild.append((guild.name, len(guild_members), len(guild_messages), size))
+        await asyncio.sleep(0)  # so the heartbeat isn't held up by the biggest guilds.
+
+    return overall, per_guild
+
+
+def live_views(bot: Bot) -> list[discord.ui.View]:
+    """
+    The views discord.py is dispatching interactions to, from its view store.
+    """
+    store = bot._connection._view_store  # type: ignore
+    views: dict[int, discord.ui.View] = {
+        id(view): view for view in store._synced_message_views.values()
+    }
+    for items in store._views.values():
+        for item in items.values():
+            if item.view is not None:
+                views[id(item.view)] = item.view
+
+    return list(views.values())
+
+
+async def view_usage(bot: Bot) -> list[Usage]:
+    """
+    The live `ui.View`s by type, the size of each type estimated from a sample.
+    """
+    by_type: dict[str, list[discord.ui.View]] = {}
+    for view in live_views(bot):
+        by_type.setdefault(type(view).__qualname__, []).append(view)
+
+    seen = roots(bot)
+    usage: list[Usage] = []
+    for name, views in sorted(by_type.items(), key=lambda item: -len(item[1])):
+        usage.append((name, len(views), estimate(views, seen)))
+        await asyncio.sleep(0)
+
+    return usage
+
+
+def attribute_usage(owner: Any, attributes: Iterable[str], prefix: str) -> list[Usage]:
+    usage: list[Usage] = []
+    for attribute in attributes:
+        obj = owner
+        for part in attribute.split("."):
+            obj = getattr(obj, part, None)
+
+        if obj is None:
+            continue
+
+        count = len(obj) if hasattr(obj, "__len__") else 1
+        usage.append((f"{prefix}.{attribute}", count, container_size(obj)))
+
+    return usage
+
+
+# the bot's own caches, as dotted paths from the bot.
+BOT_CACHES = (
+    "guild_settings._cache",
+    "prefix_resolver._compiled",
+    "pool.queries.statements",
+    "command_timings.commands",
+    "watchdog.stalls",
+)
+
+
+async def cache_usage(bot: Bot) -> list[Usage]:
+    """
+    The bot's own caches, and the ones the cogs declare in their `MEMORY`.
+    """
+    usage = attribute_usage(bot, BOT_CACHES, "bot")
+    for name, cog in bot.cogs.items():
+        await asyncio.sleep(0)
+        usage.extend(attribute_usage(cog, getattr(cog, "MEMORY", ()), name))
+
+    return usage
+
+
+class MemoryTracker:
+    """
+    Numbered `tracemalloc` snapshots, to diff any two of them for what grew in between.
+    """
+
+    def __init__(self, *, max_snapshots: int = 10) -> None:
+        self.snapshots: deque[tuple[datetime, tracemalloc.Snapshot]] = deque(
+            maxlen=max_snapshots
+        )
+        self.taken = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        # only allocations made after this are traced, so this should happen well before a snapshot.
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def snapshot(self) -> int:
+        """
+        Takes a snapshot and returns its number, this blocks for as long as it takes.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+        self.snapshots.append((datetime.now(timezone.utc), snapshot))
+        self.taken += 1
+        return self.taken
+
+    def get(self, number: int) -> Optional[tuple[datetime, tracemalloc.Snapshot]]:
+        # `snapshots` only keeps the latest few, the oldest one kept is `taken - len + 1`.
+        idx = number - (self.taken - len(self.snapshots) + 1)
+        if not 0 <= idx < len(self.snapshots):
+            return None
+
+        return self.snapshots[idx]
+
+    def diff(
+        self, old: int, new: int, *, key_type: str = "lineno", amount: int = 10
+    ) -> Optional[list[tracemalloc.StatisticDiff]]:
+        before, after = self.get(old), self.get(new)
+        if before is None or after is None:
+            return None
+
+        return after[1].compare_to(before[1], key_type)[:amount]  # type: ignore
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+
+    return f"{size:.1f}GiB"
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import logging
+
+from bisect import bisect_left
+from time import perf_counter
+from types import SimpleNamespace
+
+from aiohttp import (
+    web,
+    ClientSession,
+    TraceConfig,
+    TraceRequestEndParams,
+    TraceRequestExceptionParams,
+    TraceRequestStartParams,
+)
+
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+
+
+logger = logging.getLogger("discord")
+
+LabelValues = tuple[str, ...]
+# a collect-time callback, either returns a single value or (LABELS, VALUE) pairs.
+Collector = Callable[[], Union[float, Iterable[tuple[dict[str, str], float]]]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        *,
+        function: Optional[Collector] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self.values: dict[LabelValues, float] = {}
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[tuple[str, LabelValues, float]]:
+        if self.function is None:
+            for key, value in self.values.items():
+                yield self.name, key, value
+            return
+
+        result = self.function()
+        if isinstance(result, (int, float)):
+            yield self.name, (), float(result)
+            return
+
+        for labels, value in result:
+            yield self.name, self._key(labels), value
+
+    def expose(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, key, value in self.samples():
+            labelnames = self.labelnames
+            if name.endswith("_bucket"):
+                labelnames = (*labelnames, "le")
+
+            lines.append(f"{name}{_format_labels(labelnames, key)} {value}")
+
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Mapping of LABELS: (BUCKET_COUNTS, SUM, COUNT)
+        self.observations: dict[LabelValues, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        counts, total, count = self.observations.get(
+            key, ([0] * len(self.buckets), 0.0, 0)
+        )
+
+        idx = bisect_left(self.buckets, value)
+        if idx < len(counts):
+            counts[idx] += 1
+
+        self.observations[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> Iterable[tuple[str, LabelValues, float]]:
+        for key, (counts, total, count) in self.observations.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                yield f"{self.name}_bucket", (*key, str(bound)), cumulative
+
+            yield f"{self.name}_bucket", (*key, "+Inf"), count
+            yield f"{self.name}_sum", key, total
+            yield f"{self.name}_count", key, count
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def expose(self) -> str:
+        chunks: list[str] = []
+        for metric in self.metrics.values():
+            try:
+                chunks.append(metric.expose())
+            except Exception:
+                logger.exception(f"Failed to collect the metric {metric.name}:")
+
+        return "\n".join(chunks) + "\n"
+
+
+registry = Registry()
+
+# fmt: off
+COMMAND_INVOCATIONS = registry.counter("kana_command_invocations_total", "Command invocations.", ("command", "status"))
+COMMAND_LATENCY     = registry.histogram("kana_command_latency_seconds", "Time taken to invoke a command.", ("command",))
+DB_QUERY_LATENCY    = registry.histogram("kana_db_query_seconds", "Time taken by database queries.", ("method",))
+DB_ACQUIRE_WAIT     = registry.histogram("kana_db_acquire_wait_seconds", "Time spent waiting for a pool connection.")
+HTTP_LATENCY        = registry.histogram("kana_http_request_seconds", "Latency of outgoing HTTP requests.", ("host", "status"))
+AVATAR_UPLOADS      = registry.counter("kana_avatar_uploads_total", "Avatars uploaded by the logger.", ("kind", "status"))
+WEBHOOK_REQUESTS    = registry.counter("kana_webhook_requests_total", "Webhook executions, by the status Discord answered with.", ("webhook", "status"))
+WEBHOOK_WAIT        = registry.histogram("kana_webhook_wait_seconds", "Time spent waiting for a free webhook in a pool.", ("webhook",))
+LOOP_LAG            = registry.histogram("kana_event_loop_lag_seconds", "How late the event loop ran a scheduled callback.", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_STALLS         = registry.counter("kana_event_loop_stalls_total", "Times the event loop was blocked for longer than the watchdog threshold.")
+# fmt: on
+
+
+def http_trace_config() -> TraceConfig:
+    """
+    A `TraceConfig` that records the latency of every request of a `ClientSession` per host.
+    """
+
+    async def on_request_start(
+        _: ClientSession, ctx: SimpleNamespace, __: TraceRequestStartParams
+    ) -> None:
+        ctx.start = perf_counter()
+
+    async def on_request_end(
+        _: ClientSession, ctx: SimpleNamespace, params: TraceRequestEndParams
+    ) -> None:
+        HTTP_LATENCY.observe(
+            perf_counter() - ctx.start,
+            host=params.url.host or "unknown",
+            status=params.response.status,
+        )
+
+    async def on_request_exception(
+        _: ClientSession, ctx: SimpleNamespace, params: TraceRequestExceptionParams
+    ) -> None:
+        HTTP_LATENCY.observe(
+            perf_counter() - ctx.start,
+            host=params.url.host or "unknown",
+            status="error",
+        )
+
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+class MetricsServer:
+    """
+    Serves the registry in the Prometheus text format on `/metrics`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100) -> None:
+        self.host = host
+        self.port = port
+
+        self.app = web.Application()
+        self.app.router.add_get("/metrics", self.handle)
+        self.runner: Optional[web.AppRunner] = None
+
+    async def handle(self, _: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.expose(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def start(self) -> None:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import discord
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .subclasses import Bot
+
+
+logger = logging.getLogger("discord")
+
+
+class PrefixResolver:
+    """
+    Resolves the command prefix for a message without ever touching the database.
+
+    Guilds that aren't in the settings cache are given the default prefix
+    straight away while their settings load in the background, and the
+    message is re-processed if it turns out to use the guild's own prefix.
+    The prefix list for every distinct prefix is built once and reused
+    until that guild's prefix changes.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self._compiled: dict[str, tuple[str, ...]] = {}
+
+        # Mapping of GUILD_ID: MESSAGES waiting on that guild's settings to load.
+        self._waiting: dict[int, list[discord.Message]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def compile(self, prefix: str) -> tuple[str, ...]:
+        """
+        Returns the (cached) prefixes for `prefix`, this is
+        what `commands.when_mentioned_or` would've built on every message.
+        """
+        compiled = self._compiled.get(prefix)
+        if compiled is not None:
+            return compiled
+
+        if not self.bot.user:  # can't build the mentions yet, so don't cache it.
+            return (prefix,)
+
+        user_id = self.bot.user.id
+        compiled = self._compiled[prefix] = (
+            f"<@{user_id}> ",
+            f"<@!{user_id}> ",
+            prefix,
+        )
+        return compiled
+
+    def __call__(self, bot: Bot, message: discord.Message) -> tuple[str, ...]:
+        default = bot.guild_settings.default_prefix
+        if not message.guild:
+            return self.compile(default)
+
+        config = bot.guild_settings.get_cached(message.guild.id)
+        if config is None:
+            self._resolve_later(message, default)
+            return self.compile(default)
+
+        return self.compile(config["prefix"])
+
+    def _resolve_later(self, message: discord.Message, default: str) -> None:
+        assert message.guild
+
+        # a burst of messages from the same guild shares a single settings load.
+        if waiting := self._waiting.get(message.guild.id):
+            waiting.append(message)
+            return
+
+        self._waiting[message.guild.id] = [message]
+        task = asyncio.create_task(self._resolve_late(message.guild.id, default))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve_late(self, guild_id: int, default: str) -> None:
+        try:
+            prefix = await self.bot.guild_settings.get_prefix(guild_id)
+        except Exception:
+            self._waiting.pop(guild_id, None)
+            return logger.exception(f"Failed to load the settings of {guild_id}:")
+
+        for message in self._waiting.pop(guild_id, []):
+            if (
+                prefix != default
+                and message.content.startswith(prefix)
+                and not message.content.startswith(default)
+            ):
+                await self.bot.process_commands(message)
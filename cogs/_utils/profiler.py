@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+import threading
+
+from collections import Counter
+from time import perf_counter, sleep
+from types import FrameType
+
+from typing import Optional
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module: str = frame.f_globals.get("__name__", "?")
+    # `;` separates frames in the collapsed format, and the count follows the last space.
+    return f"{module}:{code.co_qualname}:{code.co_firstlineno}".replace(
+        ";", ":"
+    ).replace(" ", "_")
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every thread `interval` seconds apart, from a thread of its own.
+
+    Nothing is hooked into the profiled code, so the overhead is only the sampling
+    itself. That covers the event loop and the worker threads `asyncio.to_thread`
+    runs things in (like yt-dlp downloads) alike.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        # Mapping of COLLAPSED_STACK: SAMPLES
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+
+    def run(self, duration: float) -> None:
+        """
+        Samples for `duration` seconds, blocking whichever thread this is called in.
+        """
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+
+        start = perf_counter()
+        deadline = start + duration
+        while (now := perf_counter()) < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+
+                name = names.get(ident, f"thread-{ident}")
+                if ident == main:
+                    name += " (event loop)"
+
+                self.add(name, frame)
+
+            self.samples += 1
+            sleep(max(0.0, self.interval - (perf_counter() - now)))
+
+        self.elapsed = perf_counter() - start
+
+    def add(self, thread: str, frame: Optional[FrameType]) -> None:
+        labels: list[str] = []
+        while frame is not None:
+            labels.append(frame_label(frame))
+            frame = frame.f_back
+
+        labels.append(thread.replace(";", ":").replace(" ", "_"))
+        self.stacks[";".join(reversed(labels))] += 1
+
+    def collapsed(self) -> str:
+        """
+        The samples in the collapsed stack format, which flamegraph.pl and speedscope read.
+        """
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items())
+
+    def top(self, amount: int = 10) -> list[tuple[str, int]]:
+        """
+        The frames the most samples were taken in (self time), the idle event loop included.
+        """
+        leaves: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+
+        return leaves.most_common(amount)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import re
+
+from dataclasses import dataclass
+
+from typing import TYPE_CHECKING, Iterable, Literal, Optional
+
+if TYPE_CHECKING:
+    import discord
+
+
+ScanMode = Literal["match", "fullmatch", "search", "finditer"]
+
+
+@dataclass(frozen=True, slots=True)
+class ScanPattern:
+    name: str
+    regex: re.Pattern[str]
+    mode: ScanMode = "search"
+    # prefilters, all of them have to pass before the regex runs at all.
+    authors: Optional[frozenset[int]] = None
+    first_chars: Optional[str] = None
+    contains: Optional[str] = None
+
+    def run(self, content: str) -> list[re.Match[str]]:
+        if self.first_chars is not None and content[0] not in self.first_chars:
+            return []
+
+        if self.contains is not None and self.contains not in content:
+            return []
+
+        if self.mode == "finditer":
+            return list(self.regex.finditer(content))
+
+        match = getattr(self.regex, self.mode)(content)
+        return [match] if match else []
+
+
+class ScanResult:
+    """
+    Every pattern hit in a message, by pattern name.
+    """
+
+    __slots__ = ("hits",)
+
+    def __init__(self, hits: dict[str, list[re.Match[str]]]) -> None:
+        self.hits = hits
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.hits
+
+    def get(self, name: str) -> Optional[re.Match[str]]:
+        matches = self.hits.get(name)
+        return matches[0] if matches else None
+
+    def all(self, name: str) -> list[re.Match[str]]:
+        return self.hits.get(name, [])
+
+
+EMPTY = ScanResult({})
+
+
+class MessageScanner:
+    """
+    Runs every registered pattern over a message once, the result is cached on the message
+    (see `KanaMessage.scan`) so each `on_message` listener reads it instead of scanning again.
+
+    Patterns are grouped by author when they're only for specific authors, so
+    most messages only go through the patterns that apply to anyone.
+    """
+
+    def __init__(self) -> None:
+        self.patterns: dict[str, ScanPattern] = {}
+        self._by_author: dict[int, tuple[ScanPattern, ...]] = {}
+        self._any_author: tuple[ScanPattern, ...] = ()
+
+    def register(
+        self,
+        name: str,
+        regex: re.Pattern[str],
+        *,
+        mode: ScanMode = "search",
+        authors: Optional[Iterable[int]] = None,
+        first_chars: Optional[str] = None,
+        contains: Optional[str] = None,
+    ) -> None:
+        """
+        Registers (or replaces) a pattern, cogs should `unregister` theirs when they're unloaded.
+        """
+        self.patterns[name] = ScanPattern(
+            name,
+            regex,
+            mode,
+            frozenset(authors) if authors is not None else None,
+            first_chars,
+            contains,
+        )
+        self._rebuild()
+
+    def unregister(self, *names: str) -> None:
+        for name in names:
+            self.patterns.pop(name, None)
+
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        by_author: dict[int, list[ScanPattern]] = {}
+        for pattern in self.patterns.values():
+            for author in pattern.authors or ():
+                by_author.setdefault(author, []).append(pattern)
+
+        self._by_author = {k: tuple(v) for k, v in by_author.items()}
+        self._any_author = tuple(p for p in self.patterns.values() if p.authors is None)
+
+    def scan(self, message: discord.Message) -> ScanResult:
+        content = message.content
+        if not content:
+            return EMPTY
+
+        hits: dict[str, list[re.Match[str]]] = {}
+        patterns = self._by_author.get(message.author.id, ())
+        for pattern in (*patterns, *self._any_author):
+            if matches := pattern.run(content):
+                hits[pattern.name] = matches
+
+        return ScanResult(hits) if hits else EMPTY
+
+
+scanner = MessageScanner()
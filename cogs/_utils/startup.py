@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from contextlib import contextmanager
+from time import perf_counter
+
+from .intents import IncompatibleCachePolicy
+
+from typing import TYPE_CHECKING, Any, Coroutine, Generator, Iterable, Mapping, Optional
+
+if TYPE_CHECKING:
+    from .subclasses import Bot
+
+
+logger = logging.getLogger("discord")
+
+# Extensions that have to be loaded after other extensions, this
+# only has to list the ones that actually depend on each other.
+EXTENSION_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "cogs.errors": ("cogs.download",),  # imports `download.FileTooLarge`.
+}
+
+
+class StartupTimeline:
+    """
+    Records how long each phase of the startup took, relative to when the timeline was created.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = perf_counter()
+        self.phases: list[tuple[str, float, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, perf_counter())
+
+    def record(self, name: str, start: float, end: Optional[float] = None) -> None:
+        end = perf_counter() if end is None else end
+        self.phases.append((name, start - self.started_at, end - start))
+
+    def mark(self, name: str) -> None:
+        """
+        Records a phase that spans from the start of the timeline until now.
+        """
+        self.record(name, self.started_at)
+
+    def report(self) -> str:
+        width = max((len(name) for name, _, _ in self.phases), default=0)
+
+        lines = ["Startup timeline:"]
+        for name, offset, took in sorted(self.phases, key=lambda phase: phase[1]):
+            lines.append(f"  {name.ljust(width)}  at {offset:7.2f}s  took {took:7.2f}s")
+
+        return "\n".join(lines)
+
+
+async def load_extensions(
+    bot: Bot,
+    extensions: Iterable[str],
+    *,
+    dependencies: Mapping[str, Iterable[str]] = EXTENSION_DEPENDENCIES,
+) -> None:
+    """
+    Loads the extensions concurrently, an extension only waits on
+    the extensions it depends on (whether they loaded or failed).
+    """
+    extensions = list(extensions)
+    finished = {name: asyncio.Event() for name in extensions}
+    incompatible: list[str] = []
+
+    async def load(name: str) -> None:
+        for dependency in dependencies.get(name, ()):
+            if dependency in finished:
+                await finished[dependency].wait()
+
+        try:
+            with bot.timeline.phase(f"extension {name}"):
+                await bot.load_extension(name)
+        except Exception as error:
+            original = getattr(error, "original", error)
+            if isinstance(original, IncompatibleCachePolicy):
+                incompatible.extend(original.problems)
+            else:
+                logger.exception(f"Failed to load {name}, due to:")
+        else:
+            logger.info(f"Loaded {name}")
+        finally:
+            finished[name].set()
+
+    await asyncio.gather(*(load(name) for name in extensions))
+
+    # a cog that silently can't see the events it needs is worse than not starting.
+    if incompatible:
+        raise IncompatibleCachePolicy(incompatible)
+
+
+def create_startup_task(
+    bot: Bot, coro: Coroutine[Any, Any, Any], *, name: str
+) -> asyncio.Task[Any]:
+    """
+    Runs slow startup work in the background, so it doesn't hold up the
+    rest of the startup. It's recorded on the timeline once it finishes.
+    """
+
+    async def runner() -> None:
+        start = perf_counter()
+        try:
+            await coro
+        except Exception:
+            logger.exception(f"Background startup task {name!r} failed:")
+        else:
+            took = perf_counter() - start
+            logger.info(f"Background startup task {name!r} finished, took {took:.2f}s")
+        finally:
+            bot.timeline.record(f"background {name}", start)
+
+    task = asyncio.create_task(runner(), name=name)
+    bot.startup_tasks.add(task)
+    task.add_done_callback(bot.startup_tasks.discard)
+    return task
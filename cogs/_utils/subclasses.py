@@ -3,44 +3,66 @@ from discord.ext import commands
 
 import os
 import glob
-import toml
 
-import asyncpg
+import asyncio
 import logging
 
-from logging.handlers import QueueHandler
-from asyncio import Queue, Lock
+from time import perf_counter
 from aiohttp import ClientSession
 
-from typing import Any, Dict, Generator, Optional, Type, Union
+from typing import Any, Callable, Coroutine, Optional, Type, Union
 
 from cogs.animanga.anilist import AniList
 
+from .cluster import ClusterClient
+from .config import ConfigSnapshot, ConfigWriter, load_config
 from .constants import STARTUP_QUERY
-
-queue: Queue[logging.LogRecord] = Queue()
-log_handler = QueueHandler(queue)  # type: ignore
+from .database import Database, invocation
+from .guild_settings import GuildSettings
+from .intents import CachePolicy
+from .lazy import import_cost_report, timed_import
+from .logs import LogShipper
+from .log_queue import LogQueue, LogQueueHandler
+from .metrics import (
+    COMMAND_INVOCATIONS,
+    COMMAND_LATENCY,
+    MetricsServer,
+    http_trace_config,
+    registry,
+)
+from .prefix import PrefixResolver
+from .startup import StartupTimeline, create_startup_task, load_extensions
+from .timings import CommandTimings, PhaseTimer, prefix_time
+from .watchdog import LoopWatchdog
+from .webhooks import RateLimitedWebhook
+
+# the records are handed off from whatever thread logged them, see `LogQueue`.
+queue = LogQueue()
+log_handler = LogQueueHandler(queue)  # type: ignore
 
 logger = logging.getLogger("discord")  # TODO: do logging properly
 logger.addHandler(log_handler)
 
 
-def as_chunks(n: int, text: str) -> Generator[str, None, None]:
-    for i in range(0, len(text), n):
-        yield text[i : i + n]
-
-
 class Context(commands.Context["Bot"]):
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.timer = PhaseTimer()
+
     async def send(self, *args: Any, **kwargs: Any) -> discord.Message:
         embed = kwargs.get("embed")
         if embed and not embed.color:
-            kwargs["embed"].color = int(self.bot.config["Bot"]["DEFAULT_COLOR"], 16)
+            kwargs["embed"].color = self.bot.snapshot.color
 
         for embed in kwargs.get("embeds", []):
             if not embed.color:
-                embed.color = int(self.bot.config["Bot"]["DEFAULT_COLOR"], 16)
+                embed.color = self.bot.snapshot.color
 
-        return await super().send(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return await super().send(*args, **kwargs)
+        finally:
+            self.timer.add("send", perf_counter() - start)
 
     async def reply(self, *args: Any, **kwargs: Any) -> discord.Message:
         if not kwargs.get("mention_author"):
@@ -49,47 +71,136 @@ class Context(commands.Context["Bot"]):
         return await super().reply(*args, **kwargs)
 
 
-async def get_prefix(bot: "Bot", message: discord.Message):
-    if not message.guild:
-        pref = bot.config["Bot"]["DEFAULT_PREFIX"]
-        return commands.when_mentioned_or(pref)(bot, message)
-
-    q = bot.prefixes.get(message.guild.id, None)
-    if q:
-        return commands.when_mentioned_or(q)(bot, message)
-
-    pref = bot.config["Bot"]["DEFAULT_PREFIX"]
-
-    await bot.pool.execute(
-        """
-    INSERT INTO guild_settings
-        VALUES ($1, $2);
-    """,
-        message.guild.id,
-        pref,
-    )
-    bot.prefixes[message.guild.id] = pref
-
-    return commands.when_mentioned_or(pref)(bot, message)
+def get_prefix(bot: "Bot", message: discord.Message) -> tuple[str, ...]:
+    start = perf_counter()
+    try:
+        return bot.prefix_resolver(bot, message)
+    finally:
+        prefix_time.set(perf_counter() - start)
 
 
 class Bot(commands.Bot):
-    queue: Queue[logging.LogRecord]
+    queue: LogQueue
     anilist: AniList
 
     def __init__(self, *args: Any, **kwargs: Any):
         kwargs.setdefault("command_prefix", get_prefix)
+        self.timeline: StartupTimeline = (
+            kwargs.pop("timeline", None) or StartupTimeline()
+        )
+        self.cluster: Optional[ClusterClient] = kwargs.pop("cluster", None)
+        self.cache_policy: CachePolicy = kwargs.pop(
+            "cache_policy", None
+        ) or CachePolicy.from_config(kwargs["config"])
+        self.startup_tasks: set[asyncio.Task[Any]] = set()
         super().__init__(*args, **kwargs)
 
-        self.config = kwargs["config"]
-        self.config_lock = Lock()
+        self.config: dict[str, Any] = kwargs["config"]
+        self.snapshot = ConfigSnapshot.from_dict(self.config)
+        self.config_writer = ConfigWriter("Config.toml")
+        self.prefix_resolver = PrefixResolver(self)
+        self.command_timings = CommandTimings(
+            self.config["Bot"].get("TIMINGS_WINDOW", 500)
+        )
+
+        watchdog = self.config["Bot"].get("Watchdog", {})
+        self.watchdog = LoopWatchdog(
+            interval=watchdog.get("INTERVAL", 0.1),
+            threshold=watchdog.get("THRESHOLD", 0.25),
+        )
+
+        self.before_invoke(self._mark_prepared)
+        self.after_invoke(self._mark_finished)
+
+        settings = self.config["Bot"].get("GuildSettings", {})
+        self.guild_settings = GuildSettings(
+            self,
+            max_size=settings.get("CACHE_SIZE", 10_000),
+            flush_interval=settings.get("FLUSH_INTERVAL", 5.0),
+        )
+
+    async def dump_config(self) -> None:
+        """
+        Persists `self.config`, saves that happen together are merged into one write.
+        """
+        self.snapshot = ConfigSnapshot.from_dict(self.config)
+        await self.config_writer.save(self.config)
+
+    async def reload_config(self) -> ConfigSnapshot:
+        """
+        Re-reads `Config.toml` and swaps it in, without reconnecting (or re-chunking) anything.
+        """
+        config = await asyncio.to_thread(load_config, self.config_writer.path)
+        snapshot = ConfigSnapshot.from_dict(config)  # fails before anything is swapped.
 
-    async def dump_config(self):
-        async with self.config_lock:
-            with open("Config.toml") as f:
-                toml.dump(self.config, f)
+        self.config, self.snapshot = config, snapshot
+        self.apply_endpoints()
+
+        output = snapshot.raw["Bot"]["Output"]
+        self.queue.configure(
+            maxsize=output.get("QUEUE_SIZE", 1000),
+            policy=output.get("OVERFLOW_POLICY", "drop_oldest"),
+        )
 
-        logging.info("dumped config.")
+        return snapshot
+
+    def apply_endpoints(self) -> None:
+        """
+        Points the clients built at startup at `Bot.Endpoints`, again on every config reload.
+        The Spotify client is built by its cog, so that one only changes once the cog is reloaded.
+        """
+        endpoints = self.snapshot.endpoints
+        self.anilist.url = endpoints.anilist
+        # asset URLs (avatars and such) are built from this, `Logger` downloads them.
+        discord.asset.Asset.BASE = endpoints.discord_cdn
+
+    @property
+    def is_dev(self) -> bool:
+        return self.snapshot.is_dev
+
+    @property
+    def cluster_id(self) -> int:
+        return self.cluster.cluster_id if self.cluster else 0
+
+    @property
+    def shard_latencies(self) -> list[tuple[int, float]]:
+        """
+        `(SHARD_ID, LATENCY)` for every shard this process runs.
+        """
+        if isinstance(self, commands.AutoShardedBot):
+            return self.latencies
+
+        return [(self.shard_id or 0, self.latency)]
+
+    async def collect_stats(self, _: Any = None) -> dict[str, Any]:
+        return {
+            "cluster": self.cluster_id,
+            "guilds": len(self.guilds),
+            "users": len(self.users),
+            "latencies": self.shard_latencies,
+        }
+
+    async def cluster_stats(self) -> list[dict[str, Any]]:
+        """
+        The `collect_stats` of every cluster, just this one's if the bot isn't clustered.
+        """
+        stats = [await self.collect_stats()]
+        if self.cluster is not None:
+            stats.extend(s for s in await self.cluster.request("stats") if s)
+
+        return sorted(stats, key=lambda s: s["cluster"])
+
+    async def ensure_chunked(self, guild: discord.Guild) -> list[discord.Member]:
+        """
+        Returns the members of a guild, chunking it first unless `CHUNKING` is "never".
+        """
+        if self.cache_policy.chunking == "never" or guild.chunked:
+            return guild.members
+
+        return await guild.chunk()
+
+    async def _invalidate_guild(self, guild_id: int) -> None:
+        self.guild_settings.invalidate(guild_id)
 
     async def get_context(
         self,
@@ -97,11 +208,111 @@ class Bot(commands.Bot):
         *,
         cls: Type[commands.Context["Bot"]] = Context,
     ):
-        return await super().get_context(message, cls=cls)
+        start = perf_counter()
+        ctx = await super().get_context(message, cls=cls)
+
+        if isinstance(ctx, Context):
+            prefix = prefix_time.get()
+            ctx.timer.add("prefix", prefix)
+            ctx.timer.add("context", perf_counter() - start - prefix)
+
+        return ctx
+
+    async def _mark_prepared(self, ctx: Context) -> None:
+        ctx.timer.lap("prepare")
+
+    async def _mark_finished(self, ctx: Context) -> None:
+        ctx.timer.lap("callback")
+
+    async def invoke(self, ctx: commands.Context["Bot"]) -> None:
+        start = perf_counter()
+        if isinstance(ctx, Context):
+            ctx.timer.start()
+
+        token = invocation.set(
+            (ctx.cog.qualified_name if ctx.cog else "Bot", ctx.command.qualified_name)
+            if ctx.command
+            else None
+        )
+        try:
+            await super().invoke(ctx)
+        finally:
+            invocation.reset(token)
+            if ctx.command:
+                name = ctx.command.qualified_name
+                COMMAND_LATENCY.observe(perf_counter() - start, command=name)
+                COMMAND_INVOCATIONS.inc(
+                    command=name, status="error" if ctx.command_failed else "success"
+                )
+
+                if isinstance(ctx, Context):
+                    self._record_timings(name, ctx.timer)
+
+    def _record_timings(self, command: str, timer: PhaseTimer) -> None:
+        phases = timer.phases
+        if "prepare" not in phases:  # a check or converter failed.
+            timer.lap("prepare")
+
+        if "callback" in phases:
+            # sends happen inside the callback, so they're only counted once, as `send`.
+            phases["callback"] = max(0.0, phases["callback"] - phases.get("send", 0.0))
+
+        self.command_timings.record(command, phases)
+
+    def register_metrics(self) -> None:
+        """
+        Registers the gauges that are read straight off the bot whenever the metrics are scraped.
+        """
+        registry.gauge(
+            "kana_gateway_latency_seconds",
+            "Gateway heartbeat latency.",
+            function=lambda: self.latency,
+        )
+        registry.gauge(
+            "kana_guilds", "Guilds the bot is in.", function=lambda: len(self.guilds)
+        )
+        registry.gauge(
+            "kana_db_pool_size",
+            "Open database connections.",
+            function=lambda: self.pool.pool.get_size(),
+        )
+        registry.gauge(
+            "kana_db_pool_idle",
+            "Idle database connections.",
+            function=lambda: self.pool.pool.get_idle_size(),
+        )
+        registry.gauge(
+            "kana_db_pool_in_use",
+            "Database connections in use.",
+            function=lambda: self.pool.stats.in_use,
+        )
+        registry.gauge(
+            "kana_db_pool_waiting",
+            "Tasks waiting on a database connection.",
+            function=lambda: self.pool.stats.waiting,
+        )
+        registry.gauge(
+            "kana_log_queue_depth",
+            "Log records waiting to be shipped.",
+            function=lambda: self.queue.qsize(),
+        )
+        registry.counter(
+            "kana_log_records_queued_total",
+            "Log records queued.",
+            function=lambda: self.queue.queued,
+        )
+        registry.counter(
+            "kana_log_records_dropped_total",
+            "Log records dropped by the overflow policy.",
+            function=lambda: self.queue.dropped,
+        )
 
     async def on_bot_ready(self) -> None:
         await self.wait_until_ready()
+        self.timeline.mark("gateway ready")
         logger.info(f"{self.user} is online, on discord.py - {discord.__version__}")
+        logger.info(self.timeline.report())
+        logger.info(import_cost_report())
 
         # Set guild, this is crucial to other components of the bot.
         GUILD_ID = self.config["Bot"]["GUILD_ID"]
@@ -113,107 +324,180 @@ class Bot(commands.Bot):
         else:
             self.guild = self.get_guild(GUILD_ID) or await self.fetch_guild(GUILD_ID)
 
-    async def send_output(self):
-        avatar = lambda avatar_id: f"https://cdn.discordapp.com/embed/avatars/{avatar_id}.png"  # type: ignore
-
-        # fmt: off
-        # Mapping of ERROR_NO: (USERNAME, AVATAR)
-        ERROR_TYPE_MAPPING = {
-            50: ("CRITICAL", avatar(4)), # red
-            40: ("ERROR",    avatar(4)), # red
-            30: ("WARNING",  avatar(3)), # yellow
-            20: ("INFO",     avatar(1)), # grey
-            10: ("DEBUG",    avatar(1)), # grey
-             0: ("NOTSET",   avatar(1)), # grey
-        }
-        # fmt: on
-
-        while True:
-            log: logging.LogRecord = await queue.get()
-            name, avatar_url = ERROR_TYPE_MAPPING[log.levelno]
-            message = log.getMessage()
-
-            for chunk in as_chunks(2000, message):
-                await self.stdout_webhook.send(
-                    content=chunk, username=name, avatar_url=avatar_url
-                )
-
     async def setup_hook(self):
         # called before the bot starts
-        self.session = ClientSession()
+        self.session = ClientSession(trace_configs=[http_trace_config()])
         self.anilist = AniList(self.session)
+        self.apply_endpoints()
         self.start_time = discord.utils.utcnow()
-        self.is_dev = self.config["Bot"]["IS_DEV"]
 
         self.loop.create_task(self.on_bot_ready())
 
         # to redirect the errors to a webhook or not.
         output = self.config["Bot"]["Output"]
+
+        self.queue = queue
+        self.queue.configure(
+            maxsize=output.get("QUEUE_SIZE", 1000),
+            policy=output.get("OVERFLOW_POLICY", "drop_oldest"),
+        )
+        self.queue.bind(asyncio.get_running_loop())
+
+        if self.config["Bot"].get("Watchdog", {}).get("ENABLED", True):
+            self.watchdog.start(asyncio.get_running_loop())
+
+        if self.cluster is not None:
+            self.cluster.add_handler("invalidate_guild", self._invalidate_guild)
+            self.cluster.add_handler("stats", self.collect_stats)
+            self.cluster.start(asyncio.get_running_loop())
+
         if output["SEND_TO_WEBHOOK"]:
-            if output["WEBHOOK"]:
-                self.stdout_webhook = discord.Webhook.from_url(
-                    output["WEBHOOK"], session=ClientSession()
-                )  # tying it to a different session just incase
-            else:
+            if not output["WEBHOOK"]:
                 logger.info("No webhook set, creating a channel along with a webhook.")
                 channel = await self.guild.create_text_channel(name="stdout")
 
-                self.stdout_webhook = await channel.create_webhook(name="logger")
-                output["WEBHOOK"] = self.stdout_webhook.url
+                webhook = await channel.create_webhook(name="logger")
+                output["WEBHOOK"] = webhook.url
                 await self.dump_config()
 
-            self.loop.create_task(self.send_output())
-
-        conn = await asyncpg.create_pool(
-            self.config["Bot"]["PSQL_URI"], min_size=1, max_size=5  # TODO: remove this
-        )
-        if conn is None:
-            raise RuntimeError("Could not connect to the DATABASE")
+            self.stdout_webhook = RateLimitedWebhook(
+                output["WEBHOOK"], ClientSession()
+            )  # tying it to a different session just incase
+            self.log_shipper = LogShipper(
+                self.stdout_webhook,
+                queue,
+                flush_interval=output.get("FLUSH_INTERVAL", 2.0),
+            )
+            self.log_shipper.start()
 
-        self.pool = conn
+        with self.timeline.phase("database pool"):
+            self.pool = await Database.create(
+                self.config["Bot"]["PSQL_URI"],
+                self.config["Bot"].get("Database", {}),
+            )
 
-        await self.pool.execute(STARTUP_QUERY)
+        with self.timeline.phase("schema"):
+            await self.pool.execute(STARTUP_QUERY)
 
-        self.prefixes: Dict[int, str] = {
-            prefix["guild_id"]: prefix["prefix"]
-            for prefix in (
-                await self.pool.fetch("SELECT guild_id, prefix FROM guild_settings;")
-            )
-        }
+        with self.timeline.phase("settings"):
+            self.guild_settings.start()
 
-        self.disabled_modules: Dict[int, str] = {
-            module["guild_id"]: module["disabled_modules"]
-            for module in (
-                await self.pool.fetch(
-                    "SELECT guild_id, disabled_modules FROM guild_settings"
+        self.register_metrics()
+        metrics = self.config["Bot"].get("Metrics", {})
+        if metrics.get("ENABLED", False):
+            with self.timeline.phase("metrics"):
+                # every cluster serves its own metrics, on consecutive ports.
+                self.metrics_server = MetricsServer(
+                    metrics.get("HOST", "127.0.0.1"),
+                    metrics.get("PORT", 9100) + self.cluster_id,
                 )
-            )
-            if module["disabled_modules"] is not None
-        }
+                await self.metrics_server.start()
+
+        # `self.anilist` is set above, as `AniManga` depends on it
+        # being there by the time the extensions are loaded.
+        extensions = [
+            cog.replace("\\", ".").replace("/", ".").removesuffix(".py")
+            for cog in glob.glob("cogs/[!_]*")
+        ]
 
         jishaku = self.config["Jishaku"]
         if jishaku["ENABLED"]:
-            await self.load_extension("jishaku")
-
-            for config, enabled in jishaku.pop("Settings").items():
+            for config, enabled in jishaku.get("Settings", {}).items():
                 os.environ[f"JISHAKU_{config}"] = str(
                     enabled
                 )  # because it doesn't like a bool.
 
-        for cog in glob.glob("cogs/[!_]*"):
-            cog = cog.replace("\\", ".").replace("/", ".").removesuffix(".py")
-
-            try:
-                await self.load_extension(cog)
-            except Exception as _error:
-                logger.exception(f"Failed to load {cog}, due to:")
+            if self.lazy_imports:
+                self.create_startup_task(self.load_jishaku(), name="activate jishaku")
             else:
-                logger.info(f"Loaded {cog}")
+                extensions.append("jishaku")
+
+        await load_extensions(self, extensions)
+
+    @property
+    def lazy_imports(self) -> bool:
+        return self.config["Bot"].get("LAZY_IMPORTS", False)
+
+    def activate(self, owner: str, *loaders: Callable[[], Any]) -> None:
+        """
+        Imports the heavy dependencies of a cog.
+
+        With `LAZY_IMPORTS` off this happens right away. Otherwise it's deferred
+        to the background after READY, things that are used before then are
+        imported on their first use instead.
+        """
+        if not self.lazy_imports:
+            for loader in loaders:
+                loader()
+            return
+
+        async def warm_up():
+            await self.wait_until_ready()
+            for loader in loaders:
+                await asyncio.to_thread(loader)
+
+        self.create_startup_task(warm_up(), name=f"activate {owner}")
+
+    async def load_jishaku(self) -> None:
+        await self.wait_until_ready()
+
+        # importing it in a thread first means `load_extension` only has
+        # to re-run `jishaku/__init__.py`, rest of it is already imported.
+        await asyncio.to_thread(timed_import, "jishaku", owner="jishaku")
+        await self.load_extension("jishaku")
+
+    def create_startup_task(
+        self, coro: Coroutine[Any, Any, Any], *, name: str
+    ) -> asyncio.Task[Any]:
+        return create_startup_task(self, coro, name=name)
 
     def run(self, *args: Any, **kwargs: Any):
         super().run(*args, **kwargs)
 
     async def close(self):
+        self.watchdog.stop()
         await super().close()
+        if hasattr(self, "log_shipper"):
+            await self.log_shipper.close()
+            await self.stdout_webhook.session.close()
+        await self.guild_settings.close()
+        if hasattr(self, "metrics_server"):
+            await self.metrics_server.close()
         await self.pool.close()
         await self.session.close()
+
+
+class ShardedBot(Bot, commands.AutoShardedBot):
+    """
+    `Bot`, but running several shards in this process. See `Bot.Sharding` in the config.
+    """
+
+
+def create_bot(config: dict[str, Any], **kwargs: Any) -> Bot:
+    """
+    Builds the bot, an `AutoShardedBot` if sharding is enabled in the config.
+    """
+    policy = CachePolicy.from_config(config)
+    if not policy.intents.message_content:
+        logger.warning(
+            "The `message_content` intent is off, prefix commands only work when mentioning the bot."
+        )
+
+    sharding = config["Bot"].get("Sharding", {})
+    cls = Bot
+    if sharding.get("ENABLED", False) or "shard_ids" in kwargs:
+        cls = ShardedBot
+        # `None` lets discord.py use the count Discord recommends.
+        kwargs.setdefault("shard_count", sharding.get("SHARD_COUNT") or None)
+
+    return cls(
+        intents=policy.intents,
+        member_cache_flags=policy.member_cache,
+        chunk_guilds_at_startup=policy.chunk_at_startup,
+        max_messages=policy.max_messages,
+        case_insensitive=True,
+        strip_after_prefix=True,
+        config=config,
+        cache_policy=policy,
+        **kwargs,
+    )
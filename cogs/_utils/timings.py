@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections import deque
+from contextvars import ContextVar
+from time import perf_counter
+
+from typing import Mapping, Optional
+
+
+# the phases of a prefix command invocation, in the order they happen.
+#
+# - prefix: resolving the prefixes for the message (`get_prefix`).
+# - context: the rest of `Bot.get_context`, finding the command.
+# - prepare: checks, cooldowns and converters, up to the `before_invoke` hook.
+# - callback: the command itself, excluding the time it spent in `Context.send`.
+# - send: every `Context.send` (and `reply`) made while the command ran.
+PHASES = ("prefix", "context", "prepare", "callback", "send")
+PERCENTILES = (0.50, 0.95, 0.99)
+
+# set by `get_prefix`, `get_context` runs in the same task so it can pick it back up.
+prefix_time: ContextVar[float] = ContextVar("prefix_time", default=0.0)
+
+
+class RollingWindow:
+    """
+    The last `size` samples of something, for percentiles that follow recent behaviour.
+    """
+
+    __slots__ = ("samples", "count")
+
+    def __init__(self, size: int) -> None:
+        self.samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+
+    def percentiles(self, *percentiles: float) -> tuple[float, ...]:
+        if not self.samples:
+            return tuple(0.0 for _ in percentiles)
+
+        samples = sorted(self.samples)
+        last = len(samples) - 1
+        return tuple(samples[min(last, int(len(samples) * p))] for p in percentiles)
+
+
+class PhaseTimer:
+    """
+    The per-phase timings of a single invocation, kept on the `Context`.
+    """
+
+    __slots__ = ("phases", "_last")
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self._last = perf_counter()
+
+    def add(self, phase: str, elapsed: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+    def start(self) -> None:
+        self._last = perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """
+        Adds the time since the last lap (or `start`) to `phase`.
+        """
+        now = perf_counter()
+        self.add(phase, now - self._last)
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+
+class CommandTimings:
+    """
+    Rolling per-command, per-phase latency windows.
+    """
+
+    def __init__(self, window: int = 500) -> None:
+        self.window = window
+        # Mapping of COMMAND: {PHASE: WINDOW}, with the extra "total" phase.
+        self.commands: dict[str, dict[str, RollingWindow]] = {}
+
+    def record(self, command: str, phases: Mapping[str, float]) -> None:
+        windows = self.commands.get(command)
+        if windows is None:
+            windows = self.commands[command] = {
+                phase: RollingWindow(self.window) for phase in (*PHASES, "total")
+            }
+
+        for phase, elapsed in phases.items():
+            windows[phase].add(elapsed)
+
+        windows["total"].add(sum(phases.values()))
+
+    def get(self, command: str) -> Optional[dict[str, RollingWindow]]:
+        return self.commands.get(command)
+
+    def slowest(
+        self, amount: int = 10, *, percentile: float = 0.95
+    ) -> list[tuple[str, float, str]]:
+        """
+        Returns `(COMMAND, TOTAL, SLOWEST_PHASE)` for the slowest commands by the total at `percentile`.
+        """
+        results: list[tuple[str, float, str]] = []
+        for command, windows in self.commands.items():
+            (total,) = windows["total"].percentiles(percentile)
+            phase = max(PHASES, key=lambda p: windows[p].percentiles(percentile)[0])
+            results.append((command, total, phase))
+
+        results.sort(key=lambda result: result[1], reverse=True)
+        return results[:amount]
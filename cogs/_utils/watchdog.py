@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from time import perf_counter
+from types import FrameType
+
+from .metrics import LOOP_LAG, LOOP_STALLS
+from .timings import RollingWindow
+
+from typing import Optional
+
+
+logger = logging.getLogger("discord")
+
+# the innermost frames kept of a stalled stack, the outer ones are asyncio's.
+STACK_LIMIT = 25
+
+
+@dataclass
+class Stall:
+    """
+    A time the loop was blocked for longer than the threshold, as seen by the watchdog thread.
+    """
+
+    started: datetime
+    running: str
+    stack: str
+    # filled in by the loop once it gets to run again.
+    duration: Optional[float] = None
+
+
+@dataclass
+class LagMinute:
+    minute: int  # minutes since the epoch.
+    beats: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    stalls: int = 0
+
+
+@dataclass
+class _Pending:
+    stall: Stall
+    since: float  # `perf_counter` of the beat that was missed.
+
+
+def blame(frame: Optional[FrameType], task: Optional[asyncio.Task[object]]) -> str:
+    """
+    Describes what was running, the innermost cog function in the stack and the task it ran in.
+    """
+    where = "unknown"
+    while frame is not None:
+        module: str = frame.f_globals.get("__name__", "")
+        if module.startswith("cogs.") and not module.startswith("cogs._utils."):
+            where = f"{module}:{frame.f_code.co_qualname}"
+            break
+        frame = frame.f_back
+
+    if task is None:
+        return where
+
+    # listeners run in tasks named after their event, e.g. `discord.py: on_message`.
+    return f"{where} (task {task.get_name()!r})"
+
+
+class LoopWatchdog:
+    """
+    Watches how responsive the event loop is, from a thread of its own.
+
+    The loop schedules a heartbeat every `interval` seconds, how late each one
+    runs is its lag. If no heartbeat has run for `threshold` seconds the thread
+    captures the loop thread's stack, logs it along with the cog and task that
+    were running, and keeps it in `stalls`.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        window: int = 6000,
+        history: int = 60,
+        stalls: int = 20,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        self.lag = RollingWindow(window)
+        self.minutes: deque[LagMinute] = deque(maxlen=history)
+        self.stalls: deque[Stall] = deque(maxlen=stalls)
+        self.stall_count = 0
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._scheduled = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+        self._lock = threading.Lock()
+        self._pending: Optional[_Pending] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Starts watching `loop`, has to be called from the thread running it.
+        """
+        self.loop = loop
+        self._loop_thread = threading.get_ident()
+        self._scheduled = perf_counter() + self.interval
+        self._handle = loop.call_later(self.interval, self._beat)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def _beat(self) -> None:
+        now = perf_counter()
+        lag = max(0.0, now - self._scheduled)
+
+        self.lag.add(lag)
+        LOOP_LAG.observe(lag)
+        minute = self._minute()
+        minute.beats += 1
+        minute.total += lag
+        minute.max = max(minute.max, lag)
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._scheduled = now + self.interval
+
+        if pending is not None:
+            pending.stall.duration = now - pending.since
+            self.stalls.append(pending.stall)
+            self.stall_count += 1
+            minute.stalls += 1
+            LOOP_STALLS.inc()
+            logger.warning(
+                f"The event loop was blocked for {pending.stall.duration * 1000:.0f}ms "
+                f"by {pending.stall.running}."
+            )
+
+        assert self.loop is not None
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+    def _minute(self) -> LagMinute:
+        current = int(time.time() // 60)
+        if not self.minutes or self.minutes[-1].minute != current:
+            self.minutes.append(LagMinute(current))
+
+        return self.minutes[-1]
+
+    def _watch(self) -> None:
+        # checking twice per interval, so a stall is caught close to the threshold.
+        while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+            with self._lock:
+                since = self._scheduled
+                if self._pending is not None or perf_counter() - since < self.threshold:
+                    continue
+
+                stall = self._capture()
+                self._pending = _Pending(stall, since)
+
+            logger.warning(
+                f"The event loop has been blocked for over {self.threshold * 1000:.0f}ms "
+                f"by {stall.running}:\n{stall.stack}"
+            )
+
+    def _capture(self) -> Stall:
+        frame = sys._current_frames().get(self._loop_thread)
+        task = asyncio.current_task(self.loop) if self.loop else None
+
+        return Stall(
+            started=datetime.now(timezone.utc),
+            running=blame(frame, task),
+            stack="".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            if frame
+            else "",
+        )
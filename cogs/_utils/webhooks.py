@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import logging
+
+from aiohttp import ClientSession, FormData
+from time import perf_counter
+
+from .metrics import WEBHOOK_REQUESTS, WEBHOOK_WAIT
+
+from typing import Any, Optional, Sequence, Union
+
+
+logger = logging.getLogger("discord")
+
+# (FILENAME, DATA), the data isn't copied so a `memoryview` of a reused buffer works too.
+WebhookFile = tuple[str, Union[bytes, bytearray, memoryview]]
+
+
+class WebhookError(Exception):
+    def __init__(self, status: int, text: str) -> None:
+        super().__init__(f"Webhook request failed with {status}: {text}")
+        self.status = status
+        self.text = text
+
+
+class RateLimit:
+    """
+    Keeps track of a webhook's rate-limit bucket from Discord's `X-RateLimit-*` response headers.
+    """
+
+    def __init__(self) -> None:
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: float = 0.0
+
+    def delay(self) -> float:
+        """
+        How long to wait before the next request can be sent.
+        """
+        now = time.monotonic()
+        if now >= self.reset_at:
+            return 0.0
+
+        if self.remaining is not None and self.remaining <= 0:
+            return self.reset_at - now
+
+        return 0.0
+
+    def update(self, headers: Any) -> None:
+        if "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+
+        if "X-RateLimit-Reset-After" in headers:
+            self.reset_at = time.monotonic() + float(headers["X-RateLimit-Reset-After"])
+
+    def block(self, retry_after: float) -> None:
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + retry_after)
+
+
+class RateLimitedWebhook:
+    """
+    A minimal webhook client that sends through our own session, and waits on the
+    rate-limit headers instead of running into 429s.
+    """
+
+    def __init__(
+        self, url: str, session: ClientSession, *, max_retries: int = 5
+    ) -> None:
+        self.url = url.partition("?")[0].rstrip("/")
+        self.id = int(self.url.split("/")[-2])
+        self.session = session
+        self.max_retries = max_retries
+
+        self.ratelimit = RateLimit()
+        self.lock = asyncio.Lock()
+
+    def __repr__(self) -> str:
+        return f"<RateLimitedWebhook id={self.id}>"
+
+    def _build_form(
+        self, payload: dict[str, Any], files: Sequence[WebhookFile]
+    ) -> FormData:
+        form = FormData()
+        form.add_field(
+            "payload_json", json.dumps(payload), content_type="application/json"
+        )
+
+        for idx, (filename, data) in enumerate(files):
+            form.add_field(
+                f"files[{idx}]",
+                data,
+                filename=filename,
+                content_type="application/octet-stream",
+            )
+
+        return form
+
+    async def send(
+        self,
+        content: Optional[str] = None,
+        *,
+        username: Optional[str] = None,
+        avatar_url: Optional[str] = None,
+        files: Sequence[WebhookFile] = (),
+    ) -> dict[str, Any]:
+        """
+        Executes the webhook and returns the created message payload.
+        """
+        payload: dict[str, Any] = {"allowed_mentions": {"parse": []}}
+        if content:
+            payload["content"] = content
+        if username:
+            payload["username"] = username
+        if avatar_url:
+            payload["avatar_url"] = avatar_url
+        if files:
+            payload["attachments"] = [
+                {"id": idx, "filename": filename}
+                for idx, (filename, _) in enumerate(files)
+            ]
+
+        async with self.lock:
+            for _ in range(self.max_retries):
+                await asyncio.sleep(self.ratelimit.delay())
+
+                async with self.session.post(
+                    self.url,
+                    params={"wait": "true"},
+                    data=self._build_form(payload, files),
+                ) as resp:
+                    self.ratelimit.update(resp.headers)
+                    WEBHOOK_REQUESTS.inc(webhook=self.id, status=resp.status)
+
+                    if resp.status == 429:
+                        data = await resp.json()
+                        retry_after = float(data.get("retry_after", 1))
+                        # debug, the log output is shipped through one of these webhooks.
+                        logger.debug(
+                            f"{self!r} got rate-limited, retrying in {retry_after:.2f}s."
+                        )
+                        self.ratelimit.block(retry_after)
+                        continue
+
+                    if resp.status >= 400:
+                        raise WebhookError(resp.status, await resp.text())
+
+                    return await resp.json()
+
+        raise WebhookError(429, f"Gave up after {self.max_retries} attempts.")
+
+
+class WebhookPool:
+    """
+    Sends through whichever of several webhooks can take a request the soonest.
+
+    Each webhook has at most one request in flight, and is only picked once its
+    rate-limit bucket has room. Callers wait in line for the next free webhook
+    rather than each sleeping on one of their own.
+    """
+
+    def __init__(self, webhooks: Sequence[RateLimitedWebhook]) -> None:
+        self.webhooks = list(webhooks)
+        self.busy: set[RateLimitedWebhook] = set()
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    @classmethod
+    def from_urls(cls, urls: Sequence[str], session: ClientSession) -> WebhookPool:
+        return cls([RateLimitedWebhook(url, session) for url in urls])
+
+    def __len__(self) -> int:
+        return len(self.webhooks)
+
+    async def _acquire(self) -> RateLimitedWebhook:
+        if not self.webhooks:
+            raise ValueError("There are no webhooks in the pool to send through.")
+
+        async with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    free = [w for w in self.webhooks if w not in self.busy]
+                    if free:
+                        webhook = min(free, key=lambda w: w.ratelimit.delay())
+                        delay = webhook.ratelimit.delay()
+                        if not delay:
+                            self.busy.add(webhook)
+                            return webhook
+                    else:
+                        delay = None
+
+                    # woken up early if a webhook is released before the bucket resets.
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+
+    async def _release(self, webhook: RateLimitedWebhook) -> None:
+        async with self._condition:
+            self.busy.discard(webhook)
+            self._condition.notify_all()
+
+    async def send(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        """
+        `RateLimitedWebhook.send` on the first webhook that's free.
+        """
+        start = perf_counter()
+        webhook = await self._acquire()
+        WEBHOOK_WAIT.observe(perf_counter() - start, webhook=webhook.id)
+        try:
+            return await webhook.send(*args, **kwargs)
+        finally:
+            await self._release(webhook)
@@ -6,6 +6,7 @@ from aiohttp import ClientSession
 from typing import Any, Optional, TYPE_CHECKING
 
 from .. import logger
+from .._utils.config import DEFAULT_ENDPOINTS
 from .types import (
     FetchResult,
     FetchRequestResult,
@@ -149,13 +150,22 @@ def create_trailer_url(data: Trailer) -> str:
     return ""
 
 
+ANILIST_URL = DEFAULT_ENDPOINTS.anilist
+
+
 class AniList:
-    def __init__(self, session: ClientSession):
+    def __init__(self, session: ClientSession, *, url: str = ANILIST_URL):
         self.session = session
+        self.url = url
 
     @classmethod
     async def search(
-        cls, session: ClientSession, search: str, search_type: SearchType
+        cls,
+        session: ClientSession,
+        search: str,
+        search_type: SearchType,
+        *,
+        url: str = ANILIST_URL,
     ) -> list[tuple[int, str]]:
         """
         Searches for a Series, this won't return any information but rather titles.
@@ -170,10 +180,13 @@ class AniList:
 
         search_type: SEARCH_TYPE
             An Enum of either ANIME or MANGA.
+
+        url: str
+            The URL of the AniList GraphQL API.
         """
 
         req = await session.post(
-            "https://graphql.anilist.co/",
+            url,
             json={
                 "query": SEARCH_QUERY,
                 "variables": {
@@ -224,6 +237,7 @@ class AniList:
             interaction.client.session,
             current,
             SEARCH_TYPE_MAPPING[interaction.command.parent.name],
+            url=interaction.client.snapshot.endpoints.anilist,
         )
 
         return [
@@ -249,7 +263,7 @@ class AniList:
         query, animanga_id = format_query(search)
 
         req = await self.session.post(
-            "https://graphql.anilist.co/",
+            self.url,
             json={
                 "query": query,
                 "variables": {
@@ -4,23 +4,14 @@ from discord.ext import commands
 
 import re
 import asyncio
-
-import yt_dlp  # pyright: ignore[reportMissingTypeStubs] # stubs when
-
-# fmt: off
-from yt_dlp.extractor.youtube import YoutubeIE, YoutubeClipIE  # pyright: ignore[reportMissingTypeStubs]
-from yt_dlp.extractor.pinterest import PinterestIE             # pyright: ignore[reportMissingTypeStubs]
-from yt_dlp.extractor.twitter import TwitterIE                 # pyright: ignore[reportMissingTypeStubs]
-from yt_dlp.extractor.instagram import InstagramIE             # pyright: ignore[reportMissingTypeStubs]
-from yt_dlp.extractor.tiktok import TikTokIE                   # pyright: ignore[reportMissingTypeStubs]
-from yt_dlp.extractor.reddit import RedditIE                   # pyright: ignore[reportMissingTypeStubs]
-from yt_dlp.extractor.twitch import TwitchClipsIE              # pyright: ignore[reportMissingTypeStubs]
-# fmt: on
+import functools
 
 from pathlib import Path
 from time import perf_counter
 
 from . import BaseCog
+from ._utils.lazy import LazyModule, timed_import
+from ._utils.metrics import registry
 
 from typing import TYPE_CHECKING, Any, Literal, Optional, Annotated, TypedDict
 
@@ -29,6 +20,15 @@ if TYPE_CHECKING:
 
 DEFAULT_UPLOAD_LIMIT = 25 * 1024 * 1024
 
+# yt-dlp (and its extractors) take a good while to import, so they're
+# only imported once they're first needed, see `Bot.activate`.
+yt_dlp = LazyModule("yt_dlp", owner="Download")
+
+# fmt: off
+DOWNLOAD_JOBS     = registry.counter("kana_download_jobs_total", "Download jobs.", ("source", "status"))
+DOWNLOAD_DURATION = registry.histogram("kana_download_duration_seconds", "Time taken to download.", ("source",), buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+# fmt: on
+
 
 class Match(TypedDict):
     url: str
@@ -42,7 +42,7 @@ class Source:
         self._flags: set[str] = set()
 
         self.sources = {k: self.cleanse_re(v) for k, v in sources.items()}
-        self.final_regex = self.construct_re()
+        self.final_regex = re.compile(self.construct_re())
 
     def _fmt_name(self, name: str) -> str:
         return f"`{name.replace('_', ' ').title()}`"
@@ -59,9 +59,10 @@ class Source:
             return self._fmt_name(sources[0])
 
     def construct_re(self):
+        # the source groups are the outermost groups, so `lastgroup` is the source that matched.
         return (
             rf"(?{''.join(self._flags)})^"
-            rf"({ '|'.join(f'(?P<{k}>{v})' for k, v in self.sources.items()) })"
+            rf"(?:{ '|'.join(f'(?P<{k}>{v})' for k, v in self.sources.items()) })"
         )
 
     def __remove_flag(self, match: re.Match[str]) -> str:
@@ -92,29 +93,26 @@ class Source:
         if other.endswith(">"):
             other = other[:-1]
 
-        if match := re.match(self.final_regex, other):
-            for (
-                k,
-                v,
-            ) in (
-                match.groupdict().items()
-            ):  # bit jank, but don't have a work around for now.
-                if v:
-                    return {"url": match.groups()[0], "source": k}
+        if (match := self.final_regex.match(other)) and match.lastgroup:
+            return {"url": match[match.lastgroup], "source": match.lastgroup}
 
 
-# fmt: off
-sources = Source({
-    "youtube":       YoutubeIE._VALID_URL,     # pyright: ignore[reportPrivateUsage]
-    "youtube_clips": YoutubeClipIE._VALID_URL, # pyright: ignore[reportPrivateUsage]
-    "twitter":       TwitterIE._VALID_URL,     # pyright: ignore[reportPrivateUsage]
-    "pinterest":     PinterestIE._VALID_URL,   # pyright: ignore[reportPrivateUsage]
-    "tiktok":        TikTokIE._VALID_URL,      # pyright: ignore[reportPrivateUsage]
-    "instagram":     InstagramIE._VALID_URL,   # pyright: ignore[reportPrivateUsage]
-    "reddit":        RedditIE._VALID_URL,      # pyright: ignore[reportPrivateUsage]
-    "twitch_clips":  TwitchClipsIE._VALID_URL, # pyright: ignore[reportPrivateUsage]
-})
-# fmt: on
+@functools.cache
+def get_sources() -> Source:
+    # fmt: off
+    extractor = lambda name: timed_import(f"yt_dlp.extractor.{name}", owner="Download")  # type: ignore
+
+    return Source({
+        "youtube":       extractor("youtube").YoutubeIE._VALID_URL,
+        "youtube_clips": extractor("youtube").YoutubeClipIE._VALID_URL,
+        "twitter":       extractor("twitter").TwitterIE._VALID_URL,
+        "pinterest":     extractor("pinterest").PinterestIE._VALID_URL,
+        "tiktok":        extractor("tiktok").TikTokIE._VALID_URL,
+        "instagram":     extractor("instagram").InstagramIE._VALID_URL,
+        "reddit":        extractor("reddit").RedditIE._VALID_URL,
+        "twitch_clips":  extractor("twitch").TwitchClipsIE._VALID_URL,
+    })
+    # fmt: on
 
 
 class FileTooLarge(Exception):
@@ -128,6 +126,11 @@ class LinkConverter(commands.Converter["Bot"]):
     async def convert(  # pyright: ignore[reportIncompatibleMethodOverride]
         self, ctx: "Context", argument: str
     ):
+        if get_sources.cache_info().currsize:
+            sources = get_sources()
+        else:  # first use, so don't block the loop on importing the extractors.
+            sources = await asyncio.to_thread(get_sources)
+
         match = sources.match(argument)
         if match:
             return match
@@ -156,6 +159,8 @@ class Download(BaseCog):
         super().__init__(bot)
         self.DOWNLOAD_PATH = self.CONFIG["PATH_TO_DOWNLOAD"]
 
+        self.bot.activate(self.qualified_name, get_sources, yt_dlp.load)
+
     def _download(
         self,
         data: Match,
@@ -168,7 +173,7 @@ class Download(BaseCog):
 
         options = {
             "outtmpl": self.DOWNLOAD_PATH + f"{_id}_%(id)s.%(ext)s",
-            "quiet": not self.bot.config["Bot"]["IS_DEV"],
+            "quiet": not self.bot.is_dev,
             "merge_output_format": flags.fmt,
             "max_filesize": max_filesize,
         }
@@ -207,9 +212,7 @@ class Download(BaseCog):
         else:
             options["format"] = f"bestvideo+bestaudio[ext={flags.fmt}]/best"
 
-        with yt_dlp.YoutubeDL(  # pyright: ignore[reportUnknownMemberType]
-            options
-        ) as ydl:
+        with yt_dlp.YoutubeDL(options) as ydl:
             info: dict[str, Any] = ydl.extract_info(data["url"])  # pyright: ignore
 
         path = Path(
@@ -249,11 +252,17 @@ class Download(BaseCog):
                 self._download, url, flags, max_filesize=limit
             )
             end = perf_counter()
-        except yt_dlp.utils.DownloadError:  # pyright: ignore[reportUnknownMemberType]
+        except yt_dlp.utils.DownloadError:
+            DOWNLOAD_JOBS.inc(source=url["source"], status="error")
             return await msg.edit(
                 content="Could not download the URL. Double check the URL and try again."
             )
 
+        DOWNLOAD_DURATION.observe(end - start, source=url["source"])
+        DOWNLOAD_JOBS.inc(
+            source=url["source"], status="success" if path else "too_large"
+        )
+
         if not path:
             raise FileTooLarge(
                 limit, msg
@@ -1,9 +1,8 @@
 from discord.ext import commands
 
-from jishaku.features.root_command import natural_size as ns
-
 from . import BaseCog
 from ._utils import deltaconv
+from ._utils.memory import format_bytes
 from .download import FileTooLarge
 
 from typing import TYPE_CHECKING
@@ -66,7 +65,7 @@ class Errors(BaseCog):
 
         if isinstance(error, FileTooLarge):
             return await error.original_message.edit(
-                content=f"Sorry, the file is too large to upload. I can only send `{ns(error.limit)}` worth of files here."
+                content=f"Sorry, the file is too large to upload. I can only send `{format_bytes(error.limit)}` worth of files here."
             )
 
         await ctx.send("Something went wrong, this incident will be reported.")
@@ -1,20 +1,25 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, TypedDict
+from typing import TYPE_CHECKING, Optional, TypedDict
 
 import discord
 from discord import ui
 from discord.ext import commands
 
-import asyncio
 import math
+import asyncio
 
-from datetime import datetime
-from io import BytesIO
+from datetime import datetime, timedelta
 
-from . import BaseCog, logger
+from .. import BaseCog, logger
+from .._utils.buffers import BufferPool, PooledBuffer, TooLarge, read_limited
+from .._utils.intents import Requirements
+from .._utils.webhooks import WebhookPool
+from .archive import AvatarArchive, asset_key, content_hash
+from .backfill import WORKERS, AvatarBackfill
+from .batch import AvatarBatcher, PendingAvatar
 
 if TYPE_CHECKING:
-    from ._utils.subclasses import Bot
+    from .._utils.subclasses import Bot
     from typing import Any
     from typing_extensions import Self
 
@@ -186,7 +191,7 @@ class AvatarPaginator(ui.View):
             discord.Embed(
                 title=f"{self.data['user'].name}'s Avatar History",
                 description=f"Changed At: {discord.utils.format_dt(data[1])} ({discord.utils.format_dt(data[1], 'R')})",
-                color=int(self.bot.config["Bot"]["DEFAULT_COLOR"], 16),
+                color=self.bot.snapshot.color,
             )
             .set_image(url=data[0])
             .set_footer(
@@ -244,25 +249,16 @@ class AvatarPaginator(ui.View):
         await self._goto(self.data["count"] - 1, itx)
 
 
-class RotatingWebhook:
-    def __init__(self, webhooks: list[discord.Webhook]) -> None:
-        self.webhooks = webhooks
-        self.index = 0
-
-    def get(self) -> discord.Webhook:
-        if len(self.webhooks) <= self.index:
-            self.index = 0
-
-        self.index += 1
-
-        return self.webhooks[self.index - 1]
-
-    @property
-    def send(self):
-        return self.get().send
-
-
 class Logger(BaseCog):
+    # `on_user_update` is only dispatched for cached members, so every guild
+    # has to be chunked at startup, not just the ones joined since.
+    REQUIREMENTS = Requirements(
+        intents=("members",),
+        member_cache=("joined",),
+        chunking=("eager",),
+    )
+    MEMORY = ("backfill.guilds", "archive.cache", "archive.bloom.bits", "buffers.free")
+
     def __init__(self, bot: "Bot"):
         super().__init__(bot)
 
@@ -271,86 +267,200 @@ class Logger(BaseCog):
                 "Please disable the cog `Logger`, this cog isn't intended in an development enviroment."
             )
 
-        self.webhooks = RotatingWebhook(
-            [
-                discord.Webhook.from_url(URL, session=self.bot.session)
-                for URL in self.CONFIG["AVATAR_LOGGING"]["WEBHOOKS"]
-            ]
+        self.webhooks = WebhookPool.from_urls(
+            self.CONFIG["AVATAR_LOGGING"]["WEBHOOKS"], self.bot.session
         )
 
-        self.ratelimit_cooldown = commands.CooldownMapping.from_cooldown(  # type: ignore
-            15,
-            1,
-            lambda avatar: hash(
-                avatar
-            ),  # the docs say the ratelimits are 30 requests per 10 seconds, just to be safe i'm leaving a bit of headroom.
+        # avatars are read into these instead of a new `bytes` each, see `upload_avatar`.
+        self.buffers = BufferPool()
+        self.archive = AvatarArchive(self.bot.pool, budget=self.qualified_name)
+        self.batcher = AvatarBatcher(
+            self._send_batch,
+            window=self.CONFIG["AVATAR_LOGGING"].get("BATCH_WINDOW", 1.0),
+            max_size=GUILD_FILESIZE_LIMIT,
         )
 
+        self.backfill = AvatarBackfill(
+            self.bot,
+            self.upload_avatar,
+            workers=self.CONFIG["AVATAR_LOGGING"].get("WORKERS", WORKERS),
+            budget=self.qualified_name,
+        )
+
+    async def cog_load(self) -> None:
+        self.bot.create_startup_task(self.archive.load(), name="avatar archive")
+        self.backfill.start()
+        self.bot.create_startup_task(self.backfill.resume(), name="avatar backfill")
+
+    async def cog_unload(self) -> None:
+        await self.backfill.close()
+        await self.batcher.close()
+
     async def upload_avatar(
         self,
-        member: discord.Member,
+        member: discord.abc.User,
         file: discord.Asset,
-        changed_at: datetime = discord.utils.utcnow(),
+        changed_at: Optional[datetime] = None,
     ):
-        retry = self.ratelimit_cooldown.update_rate_limit(file)  # type: ignore
-        if retry:
-            await asyncio.sleep(retry)
-            await self.upload_avatar(member, file, changed_at)
+        changed_at = changed_at or discord.utils.utcnow()
 
+        # an avatar that's been archived before (a revert, or someone that was
+        # backfilled already) only needs a row pointing to the existing upload.
+        key = asset_key(file)
+        if url := await self.archive.find_or_claim("asset_key", key):
+            return await self._insert_reference(member.id, changed_at, url, None, key)
+
+        buffer = self.buffers.acquire()
+        url = None
+        try:
+            url = await self._archive_avatar(member, file, changed_at, key, buffer)
+        except asyncio.CancelledError:
+            # the batch it's in may still be sent, so the buffer isn't handed back to be reused.
+            raise
+        except Exception:
+            buffer.release()
+            raise
+        else:
+            buffer.release()
+        finally:
+            self.archive.release(key, url)
+
+    async def _archive_avatar(
+        self,
+        member: discord.abc.User,
+        file: discord.Asset,
+        changed_at: datetime,
+        key: str,
+        buffer: PooledBuffer,
+    ) -> Optional[str]:
         async with self.bot.session.get(file.url) as req:
             if req.status != 200:
                 logger.error(f"Failed to fetch {member}'s avatar. {await req.text()}")
                 return
 
-            resp = await req.read()
+            try:
+                data = await read_limited(req, buffer, GUILD_FILESIZE_LIMIT)
+            except TooLarge as error:
+                logger.error(f"AVATAR LIMIT EXCEEDED, avatar size: {error.size}")
+                return
 
             content_type = req.headers.get("Content-Type", "image/png")
 
-            data = BytesIO(resp)
-            if data.getbuffer().nbytes > GUILD_FILESIZE_LIMIT:
-                logger.error(
-                    f"AVATAR LIMIT EXCEEDED, avatar size: {data.getbuffer().nbytes}"
-                )
-                return
+        # the same image under a different asset key, like a re-uploaded avatar.
+        digest = content_hash(data)
+        if url := await self.archive.find_or_claim("avatar_hash", digest):
+            self.archive.add(url, key)
+            await self._insert_reference(member.id, changed_at, url, digest, key)
+            return url
 
-            file_ext = content_type.partition("/")[-1:][
-                0
-            ]  # not always accurate but it is in our usecase.
+        # not always accurate but it is in our usecase.
+        file_ext = content_type.partition("/")[-1]
 
-            resp = await self.webhooks.send(
-                f"{member.id}\n{changed_at.timestamp()}",
-                file=discord.File(data, f"{member.id}.{file_ext}"),
-                wait=True,
+        url = None
+        try:
+            # returns once the batch it ends up in has been sent.
+            url = await self.batcher.add(
+                member.id,
+                changed_at,
+                f"{member.id}.{file_ext}",
+                data,
+                avatar_hash=digest,
+                asset_key=key,
             )
+        finally:
+            self.archive.release(digest, url)
+
+        return url
 
-            if resp:
-                await self.bot.pool.execute(
-                    """
-                INSERT INTO avatar_history (
-                    user_id,
-                    changed_at,
-                    avatar_url
-                ) VALUES ($1, $2, $3)
-                """,
-                    member.id,
-                    changed_at,
-                    resp.attachments[0].url,
+    async def _insert_reference(
+        self,
+        user_id: int,
+        changed_at: datetime,
+        url: str,
+        digest: Optional[str],
+        key: str,
+    ) -> None:
+        await self.bot.pool.execute(
+            """
+        INSERT INTO avatar_history (
+            user_id,
+            changed_at,
+            avatar_url,
+            avatar_hash,
+            asset_key
+        ) VALUES ($1, $2, $3, $4, $5)
+        """,
+            user_id,
+            changed_at,
+            url,
+            digest,
+            key,
+            budget=self.qualified_name,
+        )
+
+    async def _send_batch(self, batch: list[PendingAvatar]) -> list[str]:
+        # the index keeps the filenames unique, a user could be in a batch more than once.
+        files = [
+            (f"{idx}_{avatar.filename}", avatar.data)
+            for idx, avatar in enumerate(batch)
+        ]
+
+        # waits in line for a webhook with room in its rate-limit bucket.
+        message = await self.webhooks.send(
+            "\n".join(
+                f"{avatar.user_id} {avatar.changed_at.timestamp()}" for avatar in batch
+            ),
+            files=files,
+        )
+
+        attachments = message["attachments"]
+        by_filename = {
+            attachment["filename"]: attachment["url"] for attachment in attachments
+        }
+        urls = [
+            by_filename.get(filename) or attachments[idx]["url"]
+            for idx, (filename, _) in enumerate(files)
+        ]
+
+        await self.bot.pool.executemany(
+            """
+        INSERT INTO avatar_history (
+            user_id,
+            changed_at,
+            avatar_url,
+            avatar_hash,
+            asset_key
+        ) VALUES ($1, $2, $3, $4, $5)
+        """,
+            [
+                (
+                    avatar.user_id,
+                    avatar.changed_at,
+                    url,
+                    avatar.avatar_hash,
+                    avatar.asset_key,
                 )
+                for avatar, url in zip(batch, urls)
+            ],
+            budget=self.qualified_name,
+        )
 
-    @commands.Cog.listener()
-    async def on_guild_join(self, guild: discord.Guild):
-        members = await guild.chunk() if not guild.chunked else guild.members
+        for avatar, url in zip(batch, urls):
+            self.archive.add(url, avatar.avatar_hash, avatar.asset_key)
 
-        for member in members:
-            if member.mutual_guilds or member is guild.me:
-                continue
+        return urls
 
-            await self.upload_avatar(member, member.display_avatar)
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        await self.backfill.backfill(guild)
 
     @commands.Cog.listener()
     async def on_member_avatar_update(
         self, before: discord.Member, after: discord.Member
     ):
+        # the upload may wait behind a backfill, so it's stamped now.
+        changed_at = discord.utils.utcnow()
+
         avatar = None
         if isinstance(before, discord.Member) and before.guild_avatar != after.guild_avatar:  # type: ignore # for some reason its a User(?) sometimes
             avatar = after.guild_avatar
@@ -360,7 +470,7 @@ class Logger(BaseCog):
         if not avatar:
             avatar = after.display_avatar
 
-        await self.upload_avatar(after, avatar)
+        self.backfill.submit(after, avatar, changed_at)
 
     @commands.Cog.listener()
     async def on_member_name_update(self, before: discord.User, _: discord.User):
@@ -372,6 +482,7 @@ class Logger(BaseCog):
             before.id,
             discord.utils.utcnow(),
             before.name,
+            budget=self.qualified_name,
         )
 
     @commands.Cog.listener()
@@ -402,6 +513,44 @@ class Logger(BaseCog):
                 view=view,
             )
 
+    @commands.command(name="backfills", hidden=True)
+    @commands.is_owner()
+    async def backfills(self, ctx: commands.Context["Bot"]):
+        """
+        Shows the progress of backfilling the avatars of newly joined guilds.
+        """
+        if not self.backfill.guilds:
+            return await ctx.send("Nothing has been backfilled since the bot started.")
+
+        rows: list[str] = []
+        for progress in self.backfill.guilds.values():
+            guild = self.bot.get_guild(progress.guild_id)
+            if progress.finished_at:
+                status = (
+                    f"finished {discord.utils.format_dt(progress.finished_at, 'R')}"
+                )
+            elif progress.eta is not None:
+                done_at = discord.utils.utcnow() + timedelta(seconds=progress.eta)
+                status = f"{progress.rate:.1f}/s, done {discord.utils.format_dt(done_at, 'R')}"
+            else:
+                status = "starting"
+
+            rows.append(
+                f"**{guild or progress.guild_id}**: {progress.done}/{progress.total} "
+                f"({progress.errors} failed), {status}"
+            )
+
+        await ctx.send(
+            embed=discord.Embed(
+                title="Avatar Backfills", description="\n".join(rows)[:4000]
+            ).set_footer(
+                text=f"{self.backfill.queue.qsize()} avatars queued, "
+                f"{self.batcher.avatars} sent in {self.batcher.batches} messages, "
+                f"{self.archive.hits} deduplicated from memory, "
+                f"{self.archive.skipped_queries} lookups skipped by the bloom filter"
+            )
+        )
+
 
 async def setup(bot: Bot):
     await bot.add_cog(Logger(bot))
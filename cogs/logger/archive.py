@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import math
+import asyncio
+import hashlib
+import logging
+
+from cachetools import LRUCache
+from urllib.parse import urlsplit
+
+import discord
+
+from typing import TYPE_CHECKING, Literal, Optional, Union
+
+if TYPE_CHECKING:
+    from .._utils.database import Database
+
+
+logger = logging.getLogger("discord")
+
+
+def asset_key(asset: discord.Asset) -> str:
+    """
+    The CDN path of an asset, like `avatars/<USER_ID>/<HASH>.png`, the same
+    for an avatar every time it comes back. Default avatars are shared by everyone.
+    """
+    return urlsplit(asset.url).path.lstrip("/")
+
+
+def content_hash(data: Union[bytes, memoryview]) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BloomFilter:
+    """
+    A set that can only answer "definitely not in it" or "probably in it", in a fixed amount of memory.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        # two hashes from one digest, combined into as many as needed (Kirsch-Mitzenmacher).
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for idx in self._indexes(key):
+            self.bits[idx >> 3] |= 1 << (idx & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[idx >> 3] & (1 << (idx & 7)) for idx in self._indexes(key))
+
+
+class AvatarArchive:
+    """
+    Finds avatars that are already archived, by their asset key or the SHA-256 of their bytes.
+
+    Recently seen keys are answered from an LRU, and the bloom filter (loaded with
+    every key in `avatar_history` at startup) rules out most new ones without a
+    query. Only keys it can't rule out are looked up in the database.
+    """
+
+    def __init__(
+        self,
+        pool: Database,
+        *,
+        cache_size: int = 50_000,
+        capacity: int = 2_000_000,
+        budget: Optional[str] = None,
+    ) -> None:
+        self.pool = pool
+        self.budget = budget
+
+        # Mapping of ASSET_KEY or CONTENT_HASH: ARCHIVED_URL
+        self.cache: LRUCache[str, str] = LRUCache(maxsize=cache_size)
+        self.bloom = BloomFilter(capacity)
+        self.loaded = False
+
+        # asset keys and content hashes being archived right now, so the same
+        # avatar isn't uploaded by every backfill worker (or live update) at once.
+        self._archiving: dict[str, asyncio.Future[Optional[str]]] = {}
+
+        self.hits = 0
+        self.skipped_queries = 0
+        self.queries = 0
+
+    async def load(self) -> None:
+        """
+        Fills the bloom filter with the keys that are already archived.
+        """
+        async with self.pool.acquire(budget=self.budget) as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    """
+                SELECT asset_key, avatar_hash
+                    FROM avatar_history
+                WHERE avatar_hash IS NOT NULL
+                """,
+                    prefetch=10_000,
+                ):
+                    self.bloom.add(record["avatar_hash"])
+                    if record["asset_key"]:
+                        self.bloom.add(record["asset_key"])
+
+        self.loaded = True
+        logger.info(f"Loaded {self.bloom.count} archived avatar keys.")
+
+    def add(self, url: str, *keys: str) -> None:
+        for key in keys:
+            self.cache[key] = url
+            self.bloom.add(key)
+
+    async def find(
+        self, column: Literal["asset_key", "avatar_hash"], key: str
+    ) -> Optional[str]:
+        """
+        Returns the archived URL of an avatar by `asset_key` or `avatar_hash` (the column), if there's one.
+        """
+        if url := self.cache.get(key):
+            self.hits += 1
+            return url
+
+        if self.loaded and key not in self.bloom:
+            self.skipped_queries += 1
+            return None
+
+        self.queries += 1
+        url = await self.pool.fetchval(
+            f"SELECT avatar_url FROM avatar_history WHERE {column} = $1 LIMIT 1",
+            key,
+            budget=self.budget,
+        )
+        if url:
+            self.cache[key] = url
+
+        return url
+
+    async def find_or_claim(
+        self, column: Literal["asset_key", "avatar_hash"], key: str
+    ) -> Optional[str]:
+        """
+        `find`, but if it isn't archived the caller is now the one archiving it, and has to
+        `release` it with its URL (or None if that failed) once it's done.
+
+        Anyone else looking for the same key meanwhile waits for that, rather than
+        archiving it again. Nothing is awaited between checking and claiming a key,
+        so two callers can't both end up claiming it.
+        """
+        while (archiving := self._archiving.get(key)) is not None:
+            if url := await asyncio.shield(archiving):
+                return url
+            # whoever was archiving it failed, the next one in line gets to try.
+
+        self._archiving[key] = asyncio.get_running_loop().create_future()
+        try:
+            url = await self.find(column, key)
+        except BaseException:
+            self.release(key, None)
+            raise
+
+        if url:
+            self.release(key, url)
+
+        return url
+
+    def release(self, key: str, url: Optional[str]) -> None:
+        if (archiving := self._archiving.pop(key, None)) and not archiving.done():
+            archiving.set_result(url)
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+
+import discord
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import perf_counter
+
+from .._utils.metrics import AVATAR_UPLOADS
+
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Optional
+
+if TYPE_CHECKING:
+    from .._utils.subclasses import Bot
+
+
+logger = logging.getLogger("discord")
+
+# lower goes first, so avatar changes as they happen never wait on a backfill.
+LIVE = 0
+BACKFILL = 1
+
+# enough uploads at once to fill a batch (of up to 10 avatars) before its window is up.
+WORKERS = 20
+
+# (USER, AVATAR, CHANGED_AT), backfilled avatars are stamped with when they're uploaded.
+Upload = Callable[
+    [discord.abc.User, discord.Asset, Optional[datetime]], Coroutine[Any, Any, Any]
+]
+
+
+@dataclass(order=True)
+class AvatarJob:
+    priority: int
+    sequence: int  # keeps jobs of the same priority in the order they came in.
+    user_id: int = field(compare=False)
+    # live jobs carry the user and avatar they're for, backfill jobs
+    # look the member up when they run, as they may have left (or changed it) by then.
+    user: Optional[discord.abc.User] = field(default=None, compare=False)
+    avatar: Optional[discord.Asset] = field(default=None, compare=False)
+    # when the change happened, not when a worker gets to it.
+    changed_at: Optional[datetime] = field(default=None, compare=False)
+    guild_id: Optional[int] = field(default=None, compare=False)
+
+
+class GuildBackfill:
+    """
+    Progress of backfilling the avatars of one guild.
+
+    Members are queued in ID order, so every member below the lowest
+    one still pending is done, that's the checkpoint it resumes from.
+    """
+
+    def __init__(self, guild_id: int, *, total: int, done: int = 0) -> None:
+        self.guild_id = guild_id
+        self.total = total
+        self.done = done
+        self.errors = 0
+        self.pending: set[int] = set()
+        self.last_user_id = 0
+        self.started = perf_counter()
+        self.started_done = done
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def next_user_id(self) -> int:
+        return min(self.pending) if self.pending else self.last_user_id + 1
+
+    @property
+    def rate(self) -> float:
+        """
+        Avatars per second, since this process started on it.
+        """
+        elapsed = perf_counter() - self.started
+        return (self.done - self.started_done) / elapsed if elapsed else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if not self.rate:
+            return None
+
+        return len(self.pending) / self.rate
+
+
+class AvatarBackfill:
+    """
+    Uploads avatars from a priority queue with a fixed number of workers.
+
+    Live avatar changes are queued ahead of the backfill of newly joined guilds,
+    the progress of which is kept in `avatar_backfill` so it resumes after a restart
+    (only until it's finished, the rows of finished backfills are deleted).
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        upload: Upload,
+        *,
+        workers: int = WORKERS,
+        checkpoint_every: int = 250,
+        budget: Optional[str] = None,
+    ) -> None:
+        self.bot = bot
+        self.upload = upload
+        self.workers = workers
+        self.checkpoint_every = checkpoint_every
+        self.budget = budget
+
+        self.queue: asyncio.PriorityQueue[AvatarJob] = asyncio.PriorityQueue()
+        self.guilds: dict[int, GuildBackfill] = {}
+        self._sequence = itertools.count()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"avatar worker {idx}")
+            for idx in range(self.workers)
+        ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        for progress in self.guilds.values():
+            if not progress.finished:
+                await self._save(progress)
+
+    def submit(
+        self, user: discord.abc.User, avatar: discord.Asset, changed_at: datetime
+    ) -> None:
+        self.queue.put_nowait(
+            AvatarJob(
+                LIVE,
+                next(self._sequence),
+                user.id,
+                user=user,
+                avatar=avatar,
+                changed_at=changed_at,
+            )
+        )
+
+    def known_members(self, exclude: discord.Guild) -> set[int]:
+        """
+        Everyone whose avatar is already logged (or about to be), the members of every
+        other guild and the ones still queued by other backfills.
+        """
+        known: set[int] = set()
+        for guild in self.bot.guilds:
+            if guild.id != exclude.id:
+                known.update(member.id for member in guild.members)
+
+        for progress in self.guilds.values():
+            if progress.guild_id != exclude.id:
+                known.update(progress.pending)
+
+        return known
+
+    async def backfill(
+        self,
+        guild: discord.Guild,
+        *,
+        resume_from: int = 0,
+        total: Optional[int] = None,
+        done: int = 0,
+    ) -> GuildBackfill:
+        """
+        Queues the members of a guild that don't share any other guild with the bot.
+        """
+        members = await self.bot.ensure_chunked(guild)
+        known = self.known_members(guild)
+        known.add(self.bot.user.id if self.bot.user else 0)
+
+        user_ids = sorted(
+            member.id
+            for member in members
+            if member.id not in known and member.id >= resume_from
+        )
+
+        progress = GuildBackfill(
+            guild.id, total=total if total is not None else len(user_ids), done=done
+        )
+        progress.pending.update(user_ids)
+        progress.last_user_id = user_ids[-1] if user_ids else resume_from
+        self.guilds[guild.id] = progress
+
+        if resume_from:
+            logger.info(
+                f"Resuming the avatar backfill of {guild} ({guild.id}), "
+                f"{len(user_ids)} of {progress.total} left."
+            )
+        else:
+            await self.bot.pool.execute(
+                """
+            INSERT INTO avatar_backfill (guild_id, next_user_id, total, done, started_at)
+                VALUES ($1, 0, $2, 0, $3)
+            ON CONFLICT (guild_id) DO UPDATE SET
+                next_user_id = 0,
+                total = EXCLUDED.total,
+                done = 0,
+                started_at = EXCLUDED.started_at
+            """,
+                guild.id,
+                progress.total,
+                discord.utils.utcnow(),
+                budget=self.budget,
+            )
+            logger.info(f"Backfilling {len(user_ids)} avatars of {guild} ({guild.id}).")
+
+        for user_id in user_ids:
+            self.queue.put_nowait(
+                AvatarJob(BACKFILL, next(self._sequence), user_id, guild_id=guild.id)
+            )
+
+        if not user_ids:
+            await self._finish(progress)
+
+        return progress
+
+    async def resume(self) -> None:
+        """
+        Picks the unfinished backfills back up, from where they were last checkpointed.
+        """
+        await self.bot.wait_until_ready()
+
+        records = await self.bot.pool.fetch(
+            "SELECT * FROM avatar_backfill",
+            budget=self.budget,
+        )
+        for record in records:
+            guild = self.bot.get_guild(record["guild_id"])
+            if guild is None:  # left while it was down, there's nothing to log anymore.
+                continue
+
+            await self.backfill(
+                guild,
+                resume_from=record["next_user_id"],
+                total=record["total"],
+                done=record["done"],
+            )
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            except Exception:
+                logger.exception(f"Failed to upload the avatar of {job.user_id}:")
+                AVATAR_UPLOADS.inc(kind=self._kind(job), status="error")
+                if progress := self.guilds.get(job.guild_id or 0):
+                    progress.errors += 1
+            else:
+                AVATAR_UPLOADS.inc(kind=self._kind(job), status="success")
+            finally:
+                self.queue.task_done()
+
+            # a cancelled upload stays pending, so it's picked back up on a resume.
+            if job.guild_id is not None:
+                await self._complete(job.guild_id, job.user_id)
+
+    @staticmethod
+    def _kind(job: AvatarJob) -> str:
+        return "live" if job.priority == LIVE else "backfill"
+
+    async def _run(self, job: AvatarJob) -> None:
+        if job.user is not None and job.avatar is not None:
+            await self.upload(job.user, job.avatar, job.changed_at)
+            return
+
+        guild = self.bot.get_guild(job.guild_id or 0)
+        member = guild.get_member(job.user_id) if guild else None
+        if member is None:
+            return
+
+        await self.upload(member, member.display_avatar, None)
+
+    async def _complete(self, guild_id: int, user_id: int) -> None:
+        progress = self.guilds.get(guild_id)
+        if progress is None:
+            return
+
+        progress.pending.discard(user_id)
+        progress.done += 1
+
+        if not progress.pending:
+            await self._finish(progress)
+        elif not progress.done % self.checkpoint_every:
+            await self._save(progress)
+            eta = progress.eta
+            logger.info(
+                f"Avatar backfill of {guild_id}: {progress.done}/{progress.total} "
+                f"({progress.rate:.1f}/s"
+                + (f", ~{eta / 60:.0f} minutes left)" if eta is not None else ")")
+            )
+
+    async def _finish(self, progress: GuildBackfill) -> None:
+        progress.finished_at = discord.utils.utcnow()
+        await self._save(progress)
+        logger.info(
+            f"Finished the avatar backfill of {progress.guild_id}, "
+            f"{progress.done} avatars ({progress.errors} failed)."
+        )
+
+    async def _save(self, progress: GuildBackfill) -> None:
+        try:
+            await self._checkpoint(progress)
+        except Exception:
+            # it only means resuming from an older checkpoint, not worth stopping a worker over.
+            logger.exception(
+                f"Failed to save the avatar backfill of {progress.guild_id}:"
+            )
+
+    async def _checkpoint(self, progress: GuildBackfill) -> None:
+        # a finished backfill has nothing left to resume, so its row isn't kept around.
+        if progress.finished:
+            await self.bot.pool.execute(
+                "DELETE FROM avatar_backfill WHERE guild_id = $1",
+                progress.guild_id,
+                budget=self.budget,
+            )
+            return
+
+        await self.bot.pool.execute(
+            """
+        UPDATE avatar_backfill
+            SET next_user_id = $2, done = $3
+        WHERE guild_id = $1
+        """,
+            progress.guild_id,
+            progress.next_user_id,
+            progress.done,
+            budget=self.budget,
+        )
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from typing import Any, Callable, Coroutine, Optional
+
+
+# the most attachments a single (webhook) message can have.
+MAX_FILES = 10
+
+
+@dataclass
+class PendingAvatar:
+    user_id: int
+    changed_at: datetime
+    filename: str
+    data: memoryview  # a view of a pooled buffer, held until the batch is sent.
+    avatar_hash: str
+    asset_key: str
+    # resolves to the URL of the uploaded attachment.
+    future: asyncio.Future[str] = field(repr=False)
+
+
+# sends a batch, and returns the attachment URL of every avatar in it (in order).
+Flush = Callable[[list[PendingAvatar]], Coroutine[Any, Any, list[str]]]
+
+
+class AvatarBatcher:
+    """
+    Collects avatars into messages of up to `MAX_FILES` attachments.
+
+    A batch is sent once it's full, once the next avatar wouldn't fit in
+    `max_size`, or `window` seconds after its first avatar came in. Batches
+    are sent in the background, so the next one is collected meanwhile.
+    """
+
+    def __init__(self, flush: Flush, *, window: float = 1.0, max_size: int) -> None:
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+
+        self.batches = 0
+        self.avatars = 0
+
+        self._pending: list[PendingAvatar] = []
+        self._size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def add(
+        self,
+        user_id: int,
+        changed_at: datetime,
+        filename: str,
+        data: memoryview,
+        *,
+        avatar_hash: str,
+        asset_key: str,
+    ) -> str:
+        """
+        Adds an avatar to the current batch, and returns its URL once the batch is sent.
+        """
+        if self._pending and self._size + len(data) > self.max_size:
+            self._send_pending()
+
+        loop = asyncio.get_running_loop()
+        avatar = PendingAvatar(
+            user_id,
+            changed_at,
+            filename,
+            data,
+            avatar_hash,
+            asset_key,
+            future=loop.create_future(),
+        )
+        self._pending.append(avatar)
+        self._size += len(data)
+
+        if len(self._pending) >= MAX_FILES:
+            self._send_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._send_pending)
+
+        return await avatar.future
+
+    def _send_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending, self._size = self._pending, [], 0
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[PendingAvatar]) -> None:
+        try:
+            urls = await self.flush(batch)
+        except Exception as error:
+            for avatar in batch:
+                if not avatar.future.done():
+                    avatar.future.set_exception(error)
+            return
+
+        self.batches += 1
+        self.avatars += len(batch)
+        for avatar, url in zip(batch, urls):
+            if not avatar.future.done():  # whoever was waiting on it got cancelled.
+                avatar.future.set_result(url)
+
+    async def close(self) -> None:
+        """
+        Sends what's left, and waits for every batch to be sent.
+        """
+        self._send_pending()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -3,6 +3,7 @@ from discord.ext import commands
 
 
 from . import BaseCog
+from ._utils.intents import Requirements
 
 from typing import TYPE_CHECKING, Optional
 
@@ -11,6 +12,9 @@ if TYPE_CHECKING:
 
 
 class Moderation(BaseCog):
+    # purging filters on the content of the messages.
+    REQUIREMENTS = Requirements(intents=("message_content",))
+
     def __init__(self, bot: "Bot"):
         super().__init__(bot)
         self.bot = bot
@@ -107,22 +111,13 @@ class Moderation(BaseCog):
 
         if prefix is None:
             return await ctx.send(
-                f"The current prefix for this server is: `{self.bot.prefixes.get(ctx.guild.id, 'uwu')}`"
+                f"The current prefix for this server is: `{await self.bot.guild_settings.get_prefix(ctx.guild.id)}`"
             )
 
         if not ctx.author.guild_permissions.administrator:
             raise commands.MissingPermissions(["administrator"])
 
-        await self.bot.pool.execute(
-            """
-        UPDATE guild_settings
-        SET prefix = $1
-        WHERE guild_id = $2;
-        """,
-            prefix,
-            ctx.guild.id,
-        )
-        self.bot.prefixes[ctx.guild.id] = prefix
+        await self.bot.guild_settings.set_prefix(ctx.guild.id, prefix)
 
         await ctx.send(f"The prefix is now `{prefix}`")
 
@@ -149,9 +144,11 @@ class Moderation(BaseCog):
         WHITE_CHECK_MARK = "\u2705"
         CROSS_EMOJI = "\u274C"
 
+        disabled_modules = await self.bot.guild_settings.disabled_modules(ctx.guild.id)
+
         desc = ""
         for module, description in self.modules.items():
-            desc += f"\n{WHITE_CHECK_MARK if module not in self.bot.disabled_modules.get(ctx.guild.id, []) else CROSS_EMOJI} {module}: {description}"
+            desc += f"\n{WHITE_CHECK_MARK if module not in disabled_modules else CROSS_EMOJI} {module}: {description}"
 
         embed = discord.Embed(title="Modules", description=desc)
         await ctx.send(embed=embed)
@@ -174,17 +171,10 @@ class Moderation(BaseCog):
         if module not in self.modules:
             return await ctx.send(f"Module `{module}` does not exist.")
 
-        if module not in self.bot.disabled_modules.get(ctx.guild.id, []):
+        if not await self.bot.guild_settings.is_disabled(ctx.guild.id, module):
             return await ctx.send(f"Module `{module}` is already enabled.")
 
-        q = """
-        UPDATE guild_settings
-            SET disabled_modules = ARRAY_REMOVE(disabled_modules, $1)
-                WHERE guild_id = $2
-        RETURNING disabled_modules;
-        """
-        disabled_modules = await self.bot.pool.fetchval(q, module, ctx.guild.id)
-        self.bot.disabled_modules[ctx.guild.id] = disabled_modules
+        await self.bot.guild_settings.enable_module(ctx.guild.id, module)
         await ctx.send(f"Module `{module}` has been enabled.")
 
     @module.command(aliases=["off"])
@@ -205,17 +195,10 @@ class Moderation(BaseCog):
         if module not in self.modules:
             return await ctx.send(f"Module `{module}` does not exist.")
 
-        if module in self.bot.disabled_modules.get(ctx.guild.id, []):
+        if await self.bot.guild_settings.is_disabled(ctx.guild.id, module):
             return await ctx.send(f"Module `{module}` is already disabled.")
 
-        q = """
-        UPDATE guild_settings
-            SET disabled_modules = ARRAY_APPEND(disabled_modules, $1)
-                WHERE guild_id = $2
-        RETURNING disabled_modules;
-        """
-        disabled_modules = await self.bot.pool.fetchval(q, module, ctx.guild.id)
-        self.bot.disabled_modules[ctx.guild.id] = disabled_modules
+        await self.bot.guild_settings.disable_module(ctx.guild.id, module)
         await ctx.send(f"Module `{module}` has been disabled.")
 
 
@@ -0,0 +1,440 @@
+import discord
+from discord.ext import commands
+
+import io
+import time
+import asyncio
+import tracemalloc
+
+from . import BaseCog
+from ._utils.memory import (
+    MemoryTracker,
+    cache_usage,
+    discord_usage,
+    format_bytes,
+    view_usage,
+)
+from ._utils.profiler import SamplingProfiler
+from ._utils.timings import PERCENTILES, PHASES
+
+from datetime import datetime, timezone
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from ._utils.subclasses import Bot, Context
+
+
+class Owner(BaseCog):
+    """
+    Owner-only commands for inspecting and managing the running bot.
+    """
+
+    def __init__(self, bot: "Bot") -> None:
+        super().__init__(bot)
+        self.memory_tracker = MemoryTracker()
+
+    async def cog_check(self, ctx: "Context") -> bool:  # type: ignore
+        if not await ctx.bot.is_owner(ctx.author):
+            raise commands.NotOwner()
+
+        return True
+
+    @commands.command(name="reloadconfig", aliases=["rc"], hidden=True)
+    async def reload_config(self, ctx: "Context"):
+        """
+        Reloads `Config.toml` in place, without restarting the bot.
+        """
+        start = time.perf_counter()
+        try:
+            await self.bot.reload_config()
+        except Exception as error:
+            return await ctx.send(f"Failed to reload the config: `{error!r}`")
+        end = time.perf_counter()
+
+        await ctx.send(f"reloaded config (took: `{(end - start) * 1000:.2f}ms`)")
+
+    @commands.command(name="pool", aliases=["dbstats"], hidden=True)
+    async def pool_stats(self, ctx: "Context"):
+        """
+        Shows live statistics of the database connection pool.
+        """
+        db = self.bot.pool
+        stats = db.stats
+
+        budgets = "\n".join(
+            f"{name}: {in_use}/{db.budget_limits[name]} in use"
+            for name, in_use in db.budget_in_use.items()
+        )
+
+        embed = (
+            discord.Embed(title="Database Pool")
+            .add_field(
+                name="Connections",
+                value=(
+                    f"{db.pool.get_size()} open ({db.pool.get_idle_size()} idle)\n"
+                    f"{stats.in_use}/{db.max_size} in use (peak {stats.peak_in_use})\n"
+                    f"{db.saturation:.0%} saturated, {stats.waiting} waiting"
+                ),
+            )
+            .add_field(
+                name="Acquire Wait",
+                value=(
+                    f"{stats.acquires} acquires\n"
+                    f"avg {stats.average_wait * 1000:.2f}ms\n"
+                    f"p95 {stats.percentile_wait(0.95) * 1000:.2f}ms\n"
+                    f"max {stats.max_wait * 1000:.2f}ms"
+                ),
+            )
+            .add_field(name="Budgets", value=budgets or "None", inline=False)
+        )
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name="timings", aliases=["latencies"], hidden=True)
+    async def timings(self, ctx: "Context", *, command: Optional[str] = None):
+        """
+        Shows the slowest commands, or the per-phase latency of a single command.
+
+        Parameters
+        -----------
+        command: str
+            The command to break down, shows the slowest commands if not given.
+        """
+        timings = self.bot.command_timings
+
+        if command is None:
+            slowest = timings.slowest(10)
+            if not slowest:
+                return await ctx.send("No commands have been invoked yet.")
+
+            rows = "\n".join(
+                f"{name:<20} {total * 1000:>9.2f}ms  {phase}"
+                for name, total, phase in slowest
+            )
+            header = f"{'command':<20} {'p95':>11}  slowest phase"
+            return await ctx.send(
+                embed=discord.Embed(
+                    title="Slowest Commands", description=f"```\n{header}\n{rows}```"
+                )
+            )
+
+        windows = timings.get(command)
+        if windows is None:
+            return await ctx.send(f"No timings for `{command}`.")
+
+        header = f"{'phase':<9}" + "".join(
+            f"{f'p{int(p * 100)} (ms)':>10}" for p in PERCENTILES
+        )
+        rows = "\n".join(
+            f"{phase:<9}"
+            + "".join(
+                f"{v * 1000:>10.2f}" for v in windows[phase].percentiles(*PERCENTILES)
+            )
+            for phase in (*PHASES, "total")
+        )
+        embed = discord.Embed(
+            title=f"Timings for {command}", description=f"```\n{header}\n{rows}```"
+        ).set_footer(
+            text=f"{windows['total'].count} invocations, last {timings.window} kept"
+        )
+
+        await ctx.send(embed=embed)
+
+    @commands.group(name="queries", invoke_without_command=True, hidden=True)
+    async def queries(self, ctx: "Context", amount: int = 10):
+        """
+        Shows the most expensive SQL statements by total time spent running them.
+
+        Parameters
+        -----------
+        amount: int
+            How many statements to show, defaults to 10.
+        """
+        top = self.bot.pool.queries.top(amount)
+        if not top:
+            return await ctx.send("No queries have been run yet.")
+
+        rows = "\n\n".join(
+            f"[{stats.id}] {stats.calls} calls, {stats.errors} errors, {stats.rows} rows\n"
+            f"total {stats.total_time * 1000:.2f}ms, avg {stats.average_time * 1000:.2f}ms, "
+            f"max {stats.max_time * 1000:.2f}ms\n"
+            f"{stats.query[:200]}"
+            for stats in top
+        )
+        await ctx.send(
+            embed=discord.Embed(
+                title="Most Expensive Queries", description=f"```sql\n{rows[:4000]}```"
+            ).set_footer(
+                text=f"use `{ctx.clean_prefix}queries explain <id>` for a plan"
+            )
+        )
+
+    @queries.command(name="explain")
+    async def queries_explain(self, ctx: "Context", statement_id: str):
+        """
+        Runs `EXPLAIN ANALYZE` on a statement from the `queries` table,
+        with the arguments it was last run with. The transaction is always rolled back.
+
+        Parameters
+        -----------
+        statement_id: str
+            The ID of the statement, as shown by the `queries` command.
+        """
+        stats = self.bot.pool.queries.find(statement_id)
+        if stats is None:
+            return await ctx.send(f"No statement with the ID `{statement_id}`.")
+
+        if stats.last_args is None:
+            return await ctx.send(
+                "The arguments it was last run with were too large to keep, it can't be explained."
+            )
+
+        try:
+            plan = await self.bot.pool.explain(stats.last_query, *stats.last_args)
+        except Exception as error:
+            return await ctx.send(f"Could not explain the statement: `{error!r}`")
+
+        await ctx.send(f"```\n{plan[:1990]}```")
+
+    @commands.group(
+        name="lag", aliases=["loop"], invoke_without_command=True, hidden=True
+    )
+    async def lag(self, ctx: "Context"):
+        """
+        Shows how responsive the event loop has been, and the last times it was blocked.
+        """
+        watchdog = self.bot.watchdog
+        if not watchdog.running:
+            return await ctx.send(
+                "The watchdog isn't running, see `Bot.Watchdog` in the config."
+            )
+
+        p50, p95, p99 = watchdog.lag.percentiles(*PERCENTILES)
+        summary = (
+            f"p50 {p50 * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms, p99 {p99 * 1000:.2f}ms\n"
+            f"{watchdog.stall_count} stalls over {watchdog.threshold * 1000:.0f}ms"
+        )
+
+        minutes = "\n".join(
+            f"{datetime.fromtimestamp(m.minute * 60, timezone.utc):%H:%M} "
+            f"{m.total / m.beats * 1000:>8.2f}ms {m.max * 1000:>9.2f}ms {m.stalls:>6}"
+            for m in list(watchdog.minutes)[-15:]
+            if m.beats
+        )
+        header = f"{'UTC':<5} {'avg':>10} {'max':>11} {'stalls':>6}"
+
+        stalls = "\n".join(
+            f"[{idx}] {discord.utils.format_dt(stall.started, 'R')} "
+            f"{(stall.duration or 0) * 1000:.0f}ms, `{stall.running}`"
+            for idx, stall in enumerate(reversed(watchdog.stalls))
+        )
+
+        embed = (
+            discord.Embed(title="Event Loop Lag", description=summary)
+            .add_field(
+                name="Last Minutes",
+                value=f"```\n{header}\n{minutes}```" if minutes else "None",
+                inline=False,
+            )
+            .add_field(
+                name="Recent Stalls", value=stalls[:1024] or "None", inline=False
+            )
+            .set_footer(text=f"use `{ctx.clean_prefix}lag stack <index>` for a stack")
+        )
+        await ctx.send(embed=embed)
+
+    @lag.command(name="stack")
+    async def lag_stack(self, ctx: "Context", index: int = 0):
+        """
+        Shows the stack the event loop was blocked in, as captured by the watchdog.
+
+        Parameters
+        -----------
+        index: int
+            The index of the stall, as shown by the `lag` command, defaults to the latest.
+        """
+        stalls = list(reversed(self.bot.watchdog.stalls))
+        if not 0 <= index < len(stalls):
+            return await ctx.send(f"No stall with the index `{index}`.")
+
+        stall = stalls[index]
+        await ctx.send(f"`{stall.running}`\n```py\n{stall.stack[-1900:]}```")
+
+    @commands.command(name="profile", hidden=True)
+    @commands.max_concurrency(1)
+    async def profile(
+        self, ctx: "Context", seconds: float = 30.0, interval: float = 10.0
+    ):
+        """
+        Samples the stacks of every thread for a while, and uploads them as collapsed stacks.
+        The file opens in speedscope, or goes through flamegraph.pl.
+
+        Parameters
+        -----------
+        seconds: float
+            How long to profile for, up to 300 seconds. Defaults to 30.
+        interval: float
+            Milliseconds between samples, defaults to 10.
+        """
+        if not 0 < seconds <= 300 or interval < 1:
+            return await ctx.send(
+                "Profile for up to 300 seconds, sampling at most every 1ms."
+            )
+
+        await ctx.send(f"Profiling for {seconds:g}s...")
+        profiler = SamplingProfiler(interval / 1000)
+        await asyncio.to_thread(profiler.run, seconds)
+
+        rows = "\n".join(
+            f"{count:>6} {frame[-60:]}" for frame, count in profiler.top(10)
+        )
+        file = discord.File(
+            io.BytesIO(profiler.collapsed().encode()),
+            f"profile-{discord.utils.utcnow():%Y%m%d-%H%M%S}.collapsed.txt",
+        )
+        await ctx.send(
+            f"{profiler.samples} samples over {profiler.elapsed:.1f}s, "
+            f"most sampled frames:\n```\n{rows[:1800]}```",
+            file=file,
+        )
+
+    @commands.group(
+        name="memory", aliases=["mem"], invoke_without_command=True, hidden=True
+    )
+    async def memory(self, ctx: "Context", guilds: int = 5):
+        """
+        Breaks the memory usage down by discord.py's caches, live views and the bot's own caches.
+        Users, members, messages and views are estimated from a sample of them.
+
+        Parameters
+        -----------
+        guilds: int
+            How many of the biggest guilds to break down, defaults to 5.
+        """
+        overall, per_guild = await discord_usage(self.bot, guilds=guilds)
+        views = await view_usage(self.bot)
+        caches = await cache_usage(self.bot)
+
+        def table(rows: list[tuple[str, int, int]]) -> str:
+            lines = "\n".join(
+                f"{name[:28]:<28} {count:>8} {format_bytes(size):>10}"
+                for name, count, size in rows
+            )
+            return f"```\n{lines}```" if lines else "None"
+
+        guild_rows = "\n".join(
+            f"{name[:20]:<20} {members:>8} {messages:>6} {format_bytes(size):>10}"
+            for name, members, messages, size in per_guild
+        )
+        guild_header = f"{'guild':<20} {'members':>8} {'msgs':>6} {'size':>10}"
+
+        embed = (
+            discord.Embed(title="Memory")
+            .add_field(name="discord.py", value=table(overall), inline=False)
+            .add_field(
+                name="Biggest Guilds",
+                value=f"```\n{guild_header}\n{guild_rows}```"[:1024],
+                inline=False,
+            )
+            .add_field(name="Views", value=table(views)[:1024], inline=False)
+            .add_field(name="Caches", value=table(caches)[:1024], inline=False)
+        )
+        if self.memory_tracker.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            embed.set_footer(
+                text=f"tracemalloc: {format_bytes(current)} traced, "
+                f"{format_bytes(peak)} peak, {self.memory_tracker.taken} snapshots"
+            )
+
+        await ctx.send(embed=embed)
+
+    @memory.command(name="start")
+    async def memory_start(self, ctx: "Context", frames: int = 1):
+        """
+        Starts tracing allocations with `tracemalloc`, this has a noticeable overhead.
+
+        Parameters
+        -----------
+        frames: int
+            How many frames of every allocation's traceback to keep, defaults to 1.
+        """
+        self.memory_tracker.start(frames)
+        await ctx.send(
+            f"Tracing allocations, use `{ctx.clean_prefix}memory snapshot` to take snapshots."
+        )
+
+    @memory.command(name="stop")
+    async def memory_stop(self, ctx: "Context"):
+        """
+        Stops tracing allocations, and drops every snapshot.
+        """
+        self.memory_tracker.stop()
+        await ctx.send("Stopped tracing allocations.")
+
+    @memory.command(name="snapshot")
+    async def memory_snapshot(self, ctx: "Context"):
+        """
+        Takes a `tracemalloc` snapshot, to diff against later ones.
+        """
+        if not self.memory_tracker.tracing:
+            return await ctx.send(
+                f"Allocations aren't being traced, use `{ctx.clean_prefix}memory start` first."
+            )
+
+        number = await asyncio.to_thread(self.memory_tracker.snapshot)
+        await ctx.send(f"Took snapshot `#{number}`.")
+
+    @memory.command(name="diff")
+    async def memory_diff(
+        self,
+        ctx: "Context",
+        old: Optional[int] = None,
+        new: Optional[int] = None,
+        key_type: str = "lineno",
+    ):
+        """
+        Shows what grew the most between two snapshots.
+
+        Parameters
+        -----------
+        old: int
+            The snapshot to compare against, defaults to the oldest one kept.
+        new: int
+            The snapshot to compare, defaults to taking a new one.
+        key_type: str
+            What to group allocations by, one of `lineno`, `filename` or `traceback`.
+        """
+        tracker = self.memory_tracker
+        if key_type not in ("lineno", "filename", "traceback"):
+            return await ctx.send(
+                "`key_type` has to be `lineno`, `filename` or `traceback`."
+            )
+
+        if new is None:
+            if not tracker.tracing:
+                return await ctx.send("Allocations aren't being traced.")
+            new = await asyncio.to_thread(tracker.snapshot)
+
+        if old is None:
+            old = tracker.taken - len(tracker.snapshots) + 1
+
+        diff = await asyncio.to_thread(tracker.diff, old, new, key_type=key_type)
+        if diff is None:
+            return await ctx.send(f"Snapshot `#{old}` or `#{new}` isn't kept anymore.")
+
+        rows = "\n\n".join(
+            f"{format_bytes(stat.size_diff):>10} ({stat.count_diff:+} blocks), "
+            f"{format_bytes(stat.size)} total\n{stat.traceback.format()[-1].strip()[:150]}"
+            for stat in diff
+        )
+        await ctx.send(
+            embed=discord.Embed(
+                title=f"Snapshot #{old} -> #{new}",
+                description=f"```\n{rows[:4000] or 'Nothing changed.'}```",
+            )
+        )
+
+
+async def setup(bot: "Bot"):
+    await bot.add_cog(Owner(bot))
@@ -11,12 +11,15 @@ import csv
 from typing import TYPE_CHECKING
 
 from . import BaseCog
+from ._utils.intents import Requirements
+from ._utils.scanner import scanner
 
 if TYPE_CHECKING:
     from typing_extensions import Self
     from typing import Optional
 
     from . import Bot, Context
+    from ._utils.library_override import KanaMessage
 
 
 POKETWO_ID = 716390085896962058
@@ -43,6 +46,9 @@ class Hint:
 
 
 class Pokemon(BaseCog):
+    REQUIREMENTS = Requirements(intents=("guild_messages", "message_content"))
+    MEMORY = ("pokemon_table", "active_spawns")
+
     def __init__(self, bot: "Bot") -> None:
         super().__init__(bot)
         self.pokemon_table: dict[str, dict[str, str]] = {}
@@ -56,10 +62,27 @@ class Pokemon(BaseCog):
             "fr": "\U0001f1eb\U0001f1f7",
         }
 
+        # only PokéTwo's messages are ever scanned for these.
+        scanner.register(
+            "poketwo_hint",
+            HINT_RE,
+            mode="fullmatch",
+            authors=(POKETWO_ID,),
+            first_chars="T",
+        )
+        scanner.register(
+            "poketwo_catch",
+            CATCH_RE,
+            mode="fullmatch",
+            authors=(POKETWO_ID,),
+            first_chars="C",
+        )
+
+    async def cog_unload(self) -> None:
+        scanner.unregister("poketwo_hint", "poketwo_catch")
+
     async def build_pokemon_table(self):
-        async with self.bot.session.get(
-            "https://raw.githubusercontent.com/poketwo/data/master/csv/pokemon.csv"
-        ) as req:
+        async with self.bot.session.get(self.bot.snapshot.endpoints.pokemon_csv) as req:
             raw_csv = await req.text()
             reader = csv.reader(io.StringIO(raw_csv))
 
@@ -86,7 +109,9 @@ class Pokemon(BaseCog):
             self.pokemon_table = final
 
     async def cog_load(self) -> None:
-        await self.build_pokemon_table()
+        # `guess` already handles the table not being built yet,
+        # so there's no need to hold up the startup on the download.
+        self.bot.create_startup_task(self.build_pokemon_table(), name="pokemon table")
 
     def guess(self, guess: Hint) -> list[str]:
         hint = str(guess)
@@ -104,7 +129,9 @@ class Pokemon(BaseCog):
         return guesses
 
     def extract_hint(self, input: str) -> Optional[Hint]:
-        match = HINT_RE.fullmatch(input)
+        return self.hint_from_match(HINT_RE.fullmatch(input))
+
+    def hint_from_match(self, match: Optional[re.Match[str]]) -> Optional[Hint]:
         if not match:
             return None
 
@@ -173,7 +200,7 @@ class Pokemon(BaseCog):
         await msg.edit(content=f"rebuilt cache (took: `{end - start:.2}s`)")
 
     @commands.Cog.listener("on_message")
-    async def poketwo_spawns(self, message: discord.Message):
+    async def poketwo_spawns(self, message: KanaMessage):
         if message.author.id != POKETWO_ID:
             return
 
@@ -181,8 +208,8 @@ class Pokemon(BaseCog):
         await self.check_poketwo_spawn(message)
         await self.check_poketwo_hints(message)
 
-    async def check_poketwo_hints(self, message: discord.Message):
-        hint = self.extract_hint(message.content)
+    async def check_poketwo_hints(self, message: KanaMessage):
+        hint = self.hint_from_match(message.scan.get("poketwo_hint"))
         if not hint:
             return
 
@@ -192,7 +219,7 @@ class Pokemon(BaseCog):
 
         self.active_spawns[message.channel.id] = hint
 
-    async def check_poketwo_spawn(self, message: discord.Message):
+    async def check_poketwo_spawn(self, message: KanaMessage):
         if not message.embeds:
             return
 
@@ -201,9 +228,8 @@ class Pokemon(BaseCog):
 
         self.active_spawns[message.channel.id] = None
 
-    async def check_poketwo_catch(self, message: discord.Message):
-        match = CATCH_RE.fullmatch(message.content)
-        if not match:
+    async def check_poketwo_catch(self, message: KanaMessage):
+        if "poketwo_catch" not in message.scan:
             return
 
         if message.channel.id in self.active_spawns:
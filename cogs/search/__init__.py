@@ -67,10 +67,20 @@ class ResultView(ui.View):
 
 
 class SpotifySearch(BaseCog):
+    MEMORY = ("spotify.token",)
+
     def __init__(self, bot: "Bot") -> None:
         super().__init__(bot)
-        self.SPOTIFY_EMOJI = self.CONFIG["Emojis"]["SPOTIFY"]
-        self.spotify = SpotifyClient(self.bot.session)
+        endpoints = self.bot.snapshot.endpoints
+        self.spotify = SpotifyClient(
+            self.bot.session,
+            api_url=endpoints.spotify_api,
+            open_url=endpoints.spotify_open,
+        )
+
+    @property
+    def SPOTIFY_EMOJI(self) -> str:
+        return self.CONFIG["Emojis"]["SPOTIFY"]
 
     @commands.group(name="spotify", aliases=["sp"], invoke_without_command=True)
     @commands.cooldown(3, 1, commands.BucketType.user)
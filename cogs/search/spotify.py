@@ -13,6 +13,7 @@ from cogs.search.types import (
     Artist,
     Topic,
 )
+from cogs._utils.config import DEFAULT_ENDPOINTS
 
 if TYPE_CHECKING:
     from aiohttp import ClientSession
@@ -175,8 +176,16 @@ strategy = {
 
 
 class SpotifyClient:
-    def __init__(self, session: "ClientSession"):
+    def __init__(
+        self,
+        session: "ClientSession",
+        *,
+        api_url: str = DEFAULT_ENDPOINTS.spotify_api,
+        open_url: str = DEFAULT_ENDPOINTS.spotify_open,
+    ):
         self.session = session
+        self.api_url = api_url
+        self.open_url = open_url
         self.token: Optional[AccessToken] = None
 
     @overload
@@ -238,7 +247,7 @@ class SpotifyClient:
         limit: int = 10,
     ) -> Any:
         async with self.session.get(
-            "https://api-partner.spotify.com/pathfinder/v1/query",
+            f"{self.api_url}/pathfinder/v1/query",
             params={
                 "operationName": search_type.value["operationName"],
                 "variables": json.dumps(
@@ -284,7 +293,7 @@ class SpotifyClient:
             return list(map(strat, data.get("items")))  # type: ignore
 
     async def renew_token(self) -> None:
-        async with self.session.get("https://open.spotify.com/get_access_token") as req:
+        async with self.session.get(f"{self.open_url}/get_access_token") as req:
             if req.status == 401:
                 raise InvalidToken(await req.text())
             elif req.status != 200:
@@ -3,8 +3,7 @@ from discord.ext import commands
 
 import os
 import time
-import psutil
-import pygit2  # pyright: ignore[reportMissingTypeStubs]
+import asyncio
 import inspect
 
 from datetime import datetime
@@ -13,11 +12,15 @@ from platform import python_version
 from typing import TYPE_CHECKING, Any, Optional
 
 from ._utils import deltaconv
+from ._utils.lazy import LazyModule
 from . import BaseCog
 
 if TYPE_CHECKING:
     from ._utils.subclasses import Bot, Context
 
+psutil = LazyModule("psutil", owner="Utility")
+pygit2 = LazyModule("pygit2", owner="Utility")
+
 
 def get_latest_commits(source_url: str, count: int = 3) -> str:
     try:
@@ -47,6 +50,17 @@ def get_latest_commits(source_url: str, count: int = 3) -> str:
         return "Could not retrieve commits."
 
 
+def process_usage() -> tuple[float, float]:
+    """
+    Returns the memory (USS, in MiB) and CPU usage of the bot's process.
+    """
+    process = psutil.Process()
+    return (
+        process.memory_full_info().uss / 1024**2,
+        process.cpu_percent() / psutil.cpu_count(),
+    )
+
+
 def format_ping(ping: float) -> str:
     if ping > 0 and ping < 150:
         color = 32  # green
@@ -60,6 +74,27 @@ def format_ping(ping: float) -> str:
     )
 
 
+def format_shards(stats: list[dict[str, Any]], current: Optional[int]) -> str:
+    lines: list[str] = []
+    for cluster in stats:
+        latencies = cluster["latencies"]
+        if len(latencies) > 8:  # too many to list, summarize the cluster instead.
+            values = [latency * 1000 for _, latency in latencies]
+            average = sum(values) / len(values)
+            shards = (
+                f"{len(values)} shards, avg {average:.0f}ms, max {max(values):.0f}ms"
+            )
+        else:
+            shards = "  ".join(
+                f"{'*' if shard_id == current else '#'}{shard_id} {latency * 1000:.0f}ms"
+                for shard_id, latency in latencies
+            )
+
+        lines.append(f"C{cluster['cluster']}: {shards}")
+
+    return "```\n" + "\n".join(lines)[:1000] + "```"
+
+
 def format_time(time: datetime, **kwargs: Any):
     return deltaconv(
         int(discord.utils.utcnow().timestamp() - time.timestamp()), **kwargs
@@ -69,9 +104,10 @@ def format_time(time: datetime, **kwargs: Any):
 class Utility(BaseCog):
     def __init__(self, bot: "Bot") -> None:
         super().__init__(bot)
-        self.emojis = self.bot.config["Bot"]["Emojis"]
         self.appinfo = None
 
+        self.bot.activate(self.qualified_name, psutil.load, pygit2.load)
+
     @commands.hybrid_command()
     async def ping(self, ctx: "Context"):
         """
@@ -93,21 +129,32 @@ class Utility(BaseCog):
         em = (
             discord.Embed(color=0xE59F9F)
             .add_field(
-                name=f"{self.emojis['WEBSOCKET']} Websocket",
+                name=f"{self.bot.snapshot.emojis['WEBSOCKET']} Websocket",
                 value=websocket,
                 inline=True,
             )
             .add_field(
-                name=f"{self.emojis['CHAT_BOX']} Message",
+                name=f"{self.bot.snapshot.emojis['CHAT_BOX']} Message",
                 value=message_ping,
                 inline=True,
             )
             .add_field(
-                name=f"{self.emojis['POSTGRES']} Database",
+                name=f"{self.bot.snapshot.emojis['POSTGRES']} Database",
                 value=postgres_ping,
                 inline=False,
             )
         )
+
+        if isinstance(self.bot, commands.AutoShardedBot):
+            em.add_field(
+                name="Shards",
+                value=format_shards(
+                    await self.bot.cluster_stats(),
+                    ctx.guild.shard_id if ctx.guild else None,
+                ),
+                inline=False,
+            )
+
         await mes.edit(content=None, embed=em)
 
     @commands.command(aliases=["src"])
@@ -120,7 +167,7 @@ class Utility(BaseCog):
         command: Optional[str]
             The command to get the source of.
         """
-        source = ctx.bot.config["Bot"]["SOURCE_URL"]
+        source = ctx.bot.snapshot.source_url
         if command is None:
             return await ctx.send(f"<{source}>")
 
@@ -129,7 +176,7 @@ class Utility(BaseCog):
         if obj is None:
             return await ctx.send("Could not find command")
 
-        branch = ctx.bot.config["Bot"]["BRANCH"]
+        branch = ctx.bot.snapshot.branch
         if obj.__class__.__name__ == "_HelpCommandImpl":
             return await ctx.send(f"no source for help yet")
 
@@ -159,20 +206,19 @@ class Utility(BaseCog):
         """
         Gets the current status of the bot.
         """
-        source = ctx.bot.config["Bot"]["SOURCE_URL"]
+        source = ctx.bot.snapshot.source_url
 
         if not self.appinfo:
             self.appinfo = await ctx.bot.application_info()
 
-        mem = psutil.Process().memory_full_info().uss / 1024**2
-        cpu = psutil.Process().cpu_percent() / psutil.cpu_count()
+        # both of these block, walking the git history especially.
+        mem, cpu = await asyncio.to_thread(process_usage)
+        commits = await asyncio.to_thread(get_latest_commits, source)
 
         embed = (
             discord.Embed(
                 description=(
-                    "**Latest Changes** "
-                    + get_latest_commits(source)
-                    + "\n".ljust(40, "\u200b")
+                    "**Latest Changes** " + commits + "\n".ljust(40, "\u200b")
                 ),
                 timestamp=discord.utils.utcnow(),
             )
@@ -193,6 +239,14 @@ class Utility(BaseCog):
                 name="Process",
                 value=f"{mem:.2f} MiB\n{cpu:.2f}% CPU",
             )
+            .add_field(
+                name="Logs",
+                value=(
+                    f"{ctx.bot.queue.queued} queued\n"
+                    f"{ctx.bot.queue.dropped} dropped\n"
+                    f"{ctx.bot.queue.qsize()} waiting"
+                ),
+            )
         )
 
         await ctx.send(embed=embed)
@@ -0,0 +1,19 @@
+"""
+A local stand-in for the third party services the bot uses (AniList, Spotify,
+the PokéTwo CSV and Discord's CDN), replaying responses recorded from the real ones.
+
+Record a cassette by proxying to the real services, then use the bot as usual:
+    python -m dev.fake_upstream cassettes/default --record
+
+Replay it, with added latency and errors:
+    python -m dev.fake_upstream cassettes/default --latency 80 --jitter 40 --error-rate 0.05 --seed 1
+
+Point `Bot.Endpoints` in `Config.toml` at it (see `UPSTREAMS` for the prefixes):
+    ANILIST = "http://127.0.0.1:8900/anilist"
+    SPOTIFY_API = "http://127.0.0.1:8900/spotify-api"
+    SPOTIFY_OPEN = "http://127.0.0.1:8900/spotify-open"
+    POKEMON_CSV = "http://127.0.0.1:8900/pokemon/pokemon.csv"
+    DISCORD_CDN = "http://127.0.0.1:8900/cdn"
+
+`GET /_stats` returns the hits, misses and injected errors per upstream.
+"""
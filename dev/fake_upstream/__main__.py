@@ -0,0 +1,66 @@
+import argparse
+import logging
+
+import discord
+from aiohttp import web
+
+from .cassette import Cassette
+from .server import FakeUpstream
+
+
+logger = logging.getLogger("discord")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serves recorded AniList, Spotify, PokéTwo CSV and CDN responses."
+    )
+    parser.add_argument("cassette", help="the directory the responses are kept in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="proxy requests that aren't recorded yet to the real services, and save them.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="added latency, in ms."
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="random extra latency, in ms."
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="the chance (0-1) of a request failing.",
+    )
+    parser.add_argument(
+        "--error-statuses",
+        default="500,502,429",
+        help="a comma separated list of the statuses injected errors use.",
+    )
+    parser.add_argument("--seed", type=int, help="seeds the latency and the errors.")
+    parser.add_argument(
+        "--no-placeholder-images",
+        action="store_true",
+        help="404 on CDN assets that aren't recorded, instead of serving a placeholder.",
+    )
+    args = parser.parse_args()
+
+    discord.utils.setup_logging()
+    server = FakeUpstream(
+        Cassette(args.cassette),
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",")],
+        seed=args.seed,
+        record=args.record,
+        placeholder_images=not args.no_placeholder_images,
+    )
+    web.run_app(server.app, host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import hashlib
+
+from pathlib import Path
+
+from typing import Optional, TypedDict
+
+
+class Entry(TypedDict):
+    method: str
+    path: str
+    status: int
+    content_type: str
+    file: str
+
+
+def request_key(method: str, path: str, query: str, body: bytes) -> str:
+    """
+    Identifies a request by everything that changes the response, headers (like auth) aren't included.
+    """
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query.encode(), body):
+        digest.update(part)
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+class Cassette:
+    """
+    Recorded responses on disk, an `index.json` of entries by request key,
+    with every body in its own file so images and CSVs are stored as they are.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.json"
+
+        self.entries: dict[str, Entry] = {}
+        if self.index_path.exists():
+            self.entries = json.loads(self.index_path.read_text())
+
+    def get(self, key: str) -> Optional[tuple[Entry, bytes]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        return entry, (self.directory / entry["file"]).read_bytes()
+
+    def put(
+        self,
+        key: str,
+        *,
+        method: str,
+        path: str,
+        status: int,
+        content_type: str,
+        body: bytes,
+    ) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        file = f"{key[:16]}.body"
+        (self.directory / file).write_bytes(body)
+        self.entries[key] = {
+            "method": method,
+            "path": path,
+            "status": status,
+            "content_type": content_type,
+            "file": file,
+        }
+        self.index_path.write_text(json.dumps(self.entries, indent=2))
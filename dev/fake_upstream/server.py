@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import random
+import asyncio
+import logging
+
+from aiohttp import ClientSession, web
+
+from cogs._utils.config import DEFAULT_ENDPOINTS
+from dev.replay.stub import PNG
+
+from .cassette import Cassette, request_key
+
+from typing import Optional, Sequence
+
+
+logger = logging.getLogger("discord")
+
+# Mapping of PREFIX: UPSTREAM, i.e. `/anilist/...` stands in for `https://graphql.anilist.co/...`.
+UPSTREAMS = {
+    "anilist": DEFAULT_ENDPOINTS.anilist,
+    "spotify-api": DEFAULT_ENDPOINTS.spotify_api,
+    "spotify-open": DEFAULT_ENDPOINTS.spotify_open,
+    "pokemon": DEFAULT_ENDPOINTS.pokemon_csv.rpartition("/")[0],
+    "cdn": DEFAULT_ENDPOINTS.discord_cdn,
+}
+
+
+class UpstreamStats:
+    __slots__ = ("hits", "misses", "errors", "recorded")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.recorded = 0
+
+
+class FakeUpstream:
+    """
+    Replays the responses in a `Cassette`, with configurable latency and error injection.
+
+    Every request is delayed by `latency` plus up to `jitter` seconds, then fails with
+    one of `error_statuses` with a chance of `error_rate`. Both come from a seeded
+    RNG, so a run with the same seed and the same requests fails the same way.
+
+    With `record` on, requests that aren't in the cassette are proxied to the real
+    upstream and saved. CDN misses are answered with a placeholder image when
+    `placeholder_images` is on, as avatars are different for every user.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (500, 502, 429),
+        seed: Optional[int] = None,
+        record: bool = False,
+        placeholder_images: bool = True,
+    ) -> None:
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.record = record
+        self.placeholder_images = placeholder_images
+
+        self.random = random.Random(seed)
+        self.stats = {name: UpstreamStats() for name in UPSTREAMS}
+        self.session: Optional[ClientSession] = None
+
+        self.app = web.Application(client_max_size=100 * 1024 * 1024)
+        self.app.router.add_get("/_stats", self.handle_stats)
+        self.app.router.add_route("*", "/{upstream}/{path:.*}", self.handle)
+        self.app.on_startup.append(self._open_session)
+        self.app.on_cleanup.append(self._close_session)
+
+    async def _open_session(self, _: web.Application) -> None:
+        if self.record:
+            self.session = ClientSession()
+
+    async def _close_session(self, _: web.Application) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+    async def handle_stats(self, _: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                name: {attr: getattr(stats, attr) for attr in UpstreamStats.__slots__}
+                for name, stats in self.stats.items()
+            }
+        )
+
+    def injected_error(self) -> Optional[web.Response]:
+        if not self.error_rate or self.random.random() >= self.error_rate:
+            return None
+
+        status = self.random.choice(self.error_statuses)
+        headers = {"Retry-After": "1"} if status == 429 else {}
+        return web.json_response(
+            {"message": "injected by fake_upstream"}, status=status, headers=headers
+        )
+
+    async def handle(self, request: web.Request) -> web.Response:
+        name = request.match_info["upstream"]
+        if name not in UPSTREAMS:
+            raise web.HTTPNotFound(text=f"unknown upstream {name!r}")
+
+        stats = self.stats[name]
+        path = "/" + request.match_info["path"]
+        body = await request.read()
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if error := self.injected_error():
+            stats.errors += 1
+            return error
+
+        key = request_key(request.method, f"/{name}{path}", request.query_string, body)
+        if recorded := self.cassette.get(key):
+            stats.hits += 1
+            entry, data = recorded
+            return web.Response(
+                body=data, status=entry["status"], content_type=entry["content_type"]
+            )
+
+        stats.misses += 1
+        if self.record:
+            return await self.proxy(request, name, path, key, body)
+
+        if name == "cdn" and self.placeholder_images:
+            return web.Response(body=PNG, content_type="image/png")
+
+        logger.warning(f"No recorded response for {request.method} /{name}{path}")
+        return web.json_response({"message": "not in the cassette"}, status=404)
+
+    async def proxy(
+        self, request: web.Request, name: str, path: str, key: str, body: bytes
+    ) -> web.Response:
+        assert self.session is not None
+
+        headers = {
+            k: v
+            for k, v in request.headers.items()
+            if k.lower() not in ("host", "content-length", "accept-encoding")
+        }
+        async with self.session.request(
+            request.method,
+            UPSTREAMS[name] + path,
+            params=request.query,
+            data=body or None,
+            headers=headers,
+        ) as resp:
+            data = await resp.read()
+            content_type = resp.content_type
+
+            # errors aren't saved, so a flaky upstream doesn't end up in the cassette.
+            if resp.status < 400:
+                self.cassette.put(
+                    key,
+                    method=request.method,
+                    path=f"/{name}{path}",
+                    status=resp.status,
+                    content_type=content_type,
+                    body=data,
+                )
+                self.stats[name].recorded += 1
+
+            return web.Response(
+                body=data, status=resp.status, content_type=content_type
+            )
@@ -0,0 +1,12 @@
+"""
+Records raw gateway dispatches from a live bot, and replays them into a bot that
+isn't connected to Discord, to measure how much traffic the cogs can handle.
+
+Recording, runs the bot like `bot.py` does and writes every dispatch it receives:
+    python -m dev.replay.record recording.jsonl.gz
+
+Replaying, REST calls go to a local stub instead of Discord:
+    python -m dev.replay.replay recording.jsonl.gz --speed 10 --config Config-replay.toml
+
+Recordings contain real message contents and user data, don't commit or share them.
+"""
@@ -0,0 +1,43 @@
+import argparse
+import logging
+
+import cogs._utils.library_override  # pyright: ignore[reportUnusedImport]
+from cogs._utils.config import load_config
+from cogs._utils.subclasses import create_bot
+
+from .recording import RecordingWriter
+
+
+logger = logging.getLogger("discord")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Runs the bot and records every gateway dispatch it receives."
+    )
+    parser.add_argument("output", help="where to write the recording (.jsonl.gz).")
+    parser.add_argument("--config", default="Config.toml")
+    parser.add_argument(
+        "--events",
+        help="a comma separated list of the dispatches to record, i.e. MESSAGE_CREATE,USER_UPDATE.",
+    )
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    writer = RecordingWriter(
+        args.output, events=set(args.events.split(",")) if args.events else None
+    )
+
+    # `on_socket_raw_receive` is only dispatched with debug events enabled.
+    bot = create_bot(config, enable_debug_events=True)
+    bot.add_listener(writer.on_socket_raw_receive)
+
+    try:
+        bot.run(config["Bot"]["TOKEN"])
+    finally:
+        writer.close()
+        logger.info(f"Recorded {writer.count} dispatches to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
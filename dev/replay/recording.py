@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+from time import perf_counter
+
+from typing import Any, Iterator, NamedTuple, Optional
+
+
+VERSION = 1
+
+
+class RecordedEvent(NamedTuple):
+    offset: float  # seconds since the recording started.
+    type: str
+    data: Any
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class RecordingWriter:
+    """
+    Writes gateway dispatches as gzipped JSON lines.
+
+    The first line is a header, every other line is `[OFFSET_MS, TYPE, DATA]`.
+    """
+
+    def __init__(self, path: str, *, events: Optional[set[str]] = None) -> None:
+        self.path = path
+        self.events = events
+        self.count = 0
+
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._file.write(dumps({"version": VERSION}) + "\n")
+        self._started_at = perf_counter()
+
+    def write(self, event_type: str, data: Any) -> None:
+        if self.events is not None and event_type not in self.events:
+            return
+
+        offset = round((perf_counter() - self._started_at) * 1000)
+        self._file.write(dumps([offset, event_type, data]) + "\n")
+        self.count += 1
+
+    async def on_socket_raw_receive(self, message: str) -> None:
+        payload = json.loads(message)
+        if payload.get("op") == 0:  # only dispatches, not heartbeats and such.
+            self.write(payload["t"], payload["d"])
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_recording(path: str) -> Iterator[RecordedEvent]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(next(f))
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported recording version {header.get('version')}")
+
+        for line in f:
+            offset, event_type, data = json.loads(line)
+            yield RecordedEvent(offset / 1000, event_type, data)
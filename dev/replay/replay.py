@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+import discord
+
+import cogs._utils.library_override  # pyright: ignore[reportUnusedImport]
+from cogs._utils.config import load_config
+from cogs._utils.subclasses import Bot, create_bot
+from cogs._utils.timings import RollingWindow
+
+from .recording import RecordedEvent, read_recording
+from .stub import DiscordStub
+
+from time import perf_counter
+
+from typing import Any, Callable, Coroutine
+
+
+logger = logging.getLogger("discord")
+
+# always shown in the report, even if they weren't called.
+HIGHLIGHTED = (
+    "message:Pokemon.poketwo_spawns",
+    "user_update:Logger.on_user_update",
+    "member_avatar_update:Logger.on_member_avatar_update",
+    "message:Bot.on_message",  # the command path, up to and including the command.
+)
+
+Listener = Callable[..., Coroutine[Any, Any, Any]]
+
+
+class LagMonitor:
+    """
+    Measures how late the loop wakes up from a short sleep, which is how long it was blocked for.
+    """
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.lag = RollingWindow(100_000)
+
+    async def run(self) -> None:
+        while True:
+            start = perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lag.add(max(0.0, perf_counter() - start - self.interval))
+
+
+class ListenerStats:
+    """
+    Wall time of every listener call, including any time it spent awaiting.
+    """
+
+    def __init__(self) -> None:
+        self.calls: dict[str, RollingWindow] = {}
+        self.totals: dict[str, float] = {}
+        self.in_flight = 0
+
+    def wrap(self, name: str, listener: Listener) -> Listener:
+        window = self.calls.setdefault(name, RollingWindow(100_000))
+
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            self.in_flight += 1
+            start = perf_counter()
+            try:
+                return await listener(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                window.add(elapsed)
+                self.totals[name] = self.totals.get(name, 0.0) + elapsed
+
+                self.in_flight -= 1
+
+        return timed
+
+    def instrument(self, bot: Bot) -> None:
+        for event, listeners in bot.extra_events.items():
+            name = event.removeprefix("on_")
+            bot.extra_events[event] = [
+                self.wrap(f"{name}:{listener.__qualname__}", listener)
+                for listener in listeners
+            ]
+
+        bot.on_message = self.wrap("message:Bot.on_message", bot.on_message)  # type: ignore
+
+    async def wait_idle(self, timeout: float, *, interval: float = 0.05) -> None:
+        """
+        Waits until no listener has run for a whole `interval`, listeners dispatch events
+        of their own (which only start on a later iteration) so `in_flight` alone isn't enough.
+        """
+        deadline = perf_counter() + timeout
+        idle_checks = 0
+        while idle_checks < 2:
+            if perf_counter() > deadline:
+                logger.warning(f"{self.in_flight} listener call(s) still running.")
+                return
+
+            await asyncio.sleep(interval)
+            idle_checks = idle_checks + 1 if not self.in_flight else 0
+
+
+async def no_chunking(guild: discord.Guild) -> list[discord.Member]:
+    return guild.members
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}ms"
+
+
+class Replayer:
+    def __init__(self, events: list[RecordedEvent], config: dict[str, Any]) -> None:
+        self.events = events
+        self.config = config
+
+        self.lag = LagMonitor()
+        self.listeners = ListenerStats()
+        self.skipped: dict[str, int] = {}
+        self.errors = 0
+
+    def prepare_config(self, stub: DiscordStub) -> None:
+        bot = self.config["Bot"]
+        # none of these should reach anything outside of this process.
+        bot["Output"]["SEND_TO_WEBHOOK"] = False
+        bot.setdefault("Sharding", {})["ENABLED"] = False
+        bot.setdefault("Metrics", {})["ENABLED"] = False
+        bot.setdefault("Endpoints", {})["DISCORD_CDN"] = stub.base_url
+
+        # the avatar logging webhooks are executed with our own client, not through `Route.BASE`.
+        avatars = (
+            self.config.get("Cogs", {}).get("Logger", {}).get("AVATAR_LOGGING", {})
+        )
+        avatars["WEBHOOKS"] = [
+            f"{stub.base_url}/api/v10/webhooks/{url.partition('/webhooks/')[-1]}"
+            for url in avatars.get("WEBHOOKS", [])
+        ]
+
+    async def run(self, *, speed: float) -> str:
+        ready = next((e for e in self.events if e.type == "READY"), None)
+        if ready is None:
+            raise ValueError(
+                "The recording doesn't have a READY, it can't be replayed."
+            )
+
+        stub = DiscordStub(ready.data["user"])
+        await stub.start()
+        stub.install()
+
+        self.prepare_config(stub)
+        bot = create_bot(self.config)
+        # there's no gateway to request the members from.
+        bot._connection._chunk_guilds = False  # type: ignore
+        bot.ensure_chunked = no_chunking  # type: ignore
+
+        await bot.login("replay")  # runs `setup_hook`, against the stub.
+        self.listeners.instrument(bot)
+
+        lag_task = asyncio.create_task(self.lag.run())
+        parsers = bot._connection.parsers  # type: ignore
+
+        start = perf_counter()
+        for idx, event in enumerate(self.events):
+            if speed:
+                delay = event.offset / speed - (perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif not idx % 100:  # let the listeners run every so often.
+                await asyncio.sleep(0)
+
+            parser = parsers.get(event.type)
+            if parser is None:
+                self.skipped[event.type] = self.skipped.get(event.type, 0) + 1
+                continue
+
+            try:
+                parser(event.data)
+            except Exception:
+                self.errors += 1
+                logger.exception(f"Failed to parse a {event.type}:")
+
+        dispatched = perf_counter() - start
+        await self.listeners.wait_idle(timeout=60)
+        elapsed = perf_counter() - start
+
+        lag_task.cancel()
+        report = self.report(bot, stub, dispatched, elapsed)
+
+        await bot.close()
+        await stub.close()
+        return report
+
+    def report(
+        self, bot: Bot, stub: DiscordStub, dispatched: float, elapsed: float
+    ) -> str:
+        replayed = len(self.events) - sum(self.skipped.values())
+        lines = [
+            f"replayed {replayed} events in {elapsed:.2f}s "
+            f"({replayed / elapsed:.1f} events/s, dispatched in {dispatched:.2f}s), "
+            f"{self.errors} parse errors",
+        ]
+
+        p50, p95, p99 = self.lag.lag.percentiles(0.50, 0.95, 0.99)
+        samples = sorted(self.lag.lag.samples)
+        lines.append(
+            f"loop lag: p50 {ms(p50)}, p95 {ms(p95)}, p99 {ms(p99)}, "
+            f"max {ms(samples[-1] if samples else 0.0)}"
+        )
+
+        lines.append("")
+        lines.append(
+            f"{'listener':<55} {'calls':>7} {'total':>11} {'avg':>10} {'p95':>10}"
+        )
+        names = sorted(
+            set(HIGHLIGHTED) | set(self.listeners.calls),
+            key=lambda name: self.listeners.totals.get(name, 0.0),
+            reverse=True,
+        )
+        for name in names:
+            window = self.listeners.calls.get(name)
+            calls = window.count if window else 0
+            total = self.listeners.totals.get(name, 0.0)
+            (p95,) = window.percentiles(0.95) if window else (0.0,)
+            average = total / calls if calls else 0.0
+            lines.append(
+                f"{name:<55} {calls:>7} {ms(total):>11} {ms(average):>10} {ms(p95):>10}"
+            )
+
+        slowest = bot.command_timings.slowest(10)
+        if slowest:
+            lines.append("")
+            lines.append(f"{'command':<30} {'p95':>10}  slowest phase")
+            lines.extend(
+                f"{name:<30} {ms(total):>10}  {phase}" for name, total, phase in slowest
+            )
+
+        lines.append("")
+        lines.append(f"stub: {stub.requests} requests")
+        lines.extend(
+            f"  unhandled {count:>5}x {route}"
+            for route, count in sorted(stub.unhandled.items(), key=lambda i: -i[1])
+        )
+        if self.skipped:
+            lines.append(
+                "skipped (no parser): "
+                + ", ".join(f"{k} x{v}" for k, v in self.skipped.items())
+            )
+
+        return "\n".join(lines)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replays a gateway recording into a bot that isn't connected to Discord."
+    )
+    parser.add_argument("recording")
+    parser.add_argument("--config", default="Config.toml")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="how many times faster than it was recorded, 0 replays it as fast as possible.",
+    )
+    args = parser.parse_args()
+
+    discord.utils.setup_logging()
+    replayer = Replayer(list(read_recording(args.recording)), load_config(args.config))
+    print(await replayer.run(speed=args.speed))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import base64
+import itertools
+import logging
+
+import discord
+from aiohttp import web
+
+from typing import Any, Optional
+
+
+logger = logging.getLogger("discord")
+
+# a 1x1 transparent PNG, served for every CDN asset.
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+class DiscordStub:
+    """
+    A local stand-in for Discord's REST API and CDN, answering just enough for the
+    bot to log in, send and edit messages and execute webhooks.
+
+    Anything it doesn't know is answered with an empty object, and counted
+    in `unhandled` so the replay report shows what the cogs tried to call.
+    """
+
+    def __init__(
+        self, user: dict[str, Any], *, host: str = "127.0.0.1", port: int = 0
+    ) -> None:
+        self.user = user
+        self.host = host
+        self.port = port
+
+        self.requests = 0
+        self.unhandled: dict[str, int] = {}
+        self._ids = itertools.count()
+
+        self.app = web.Application(client_max_size=100 * 1024 * 1024)
+        self.app.router.add_route("*", "/{path:.*}", self.handle)
+        self.runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def snowflake(self) -> int:
+        return discord.utils.time_snowflake(discord.utils.utcnow()) + next(self._ids)
+
+    async def start(self) -> None:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+
+        if not self.port:  # pick up the port the OS gave us.
+            self.port = site._server.sockets[0].getsockname()[1]  # type: ignore
+
+    async def close(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def install(self) -> None:
+        """
+        Points discord.py's REST routes and CDN assets at the stub, for the whole process.
+        """
+        discord.http.Route.BASE = f"{self.base_url}/api/v10"
+        discord.webhook.async_.Route.BASE = f"{self.base_url}/api/v10"
+        discord.asset.Asset.BASE = self.base_url
+
+    async def _payload(self, request: web.Request) -> dict[str, Any]:
+        if request.content_type == "multipart/form-data":
+            reader = await request.multipart()
+            while part := await reader.next():
+                if getattr(part, "name", None) == "payload_json":
+                    return await part.json() or {}  # type: ignore
+            return {}
+
+        if request.can_read_body:
+            return await request.json()
+
+        return {}
+
+    def message(self, channel_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+        attachments: list[dict[str, Any]] = []
+        for attachment in payload.get("attachments") or []:
+            filename = attachment.get("filename", "file")
+            url = f"{self.base_url}/attachments/{filename}"
+            attachments.append(
+                {
+                    "id": str(self.snowflake()),
+                    "filename": filename,
+                    "size": 0,
+                    "url": url,
+                    "proxy_url": url,
+                }
+            )
+
+        return {
+            "id": str(self.snowflake()),
+            "channel_id": channel_id,
+            "type": 0,
+            "content": payload.get("content") or "",
+            "author": self.user,
+            "embeds": payload.get("embeds") or [],
+            "attachments": attachments,
+            "timestamp": discord.utils.utcnow().isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "pinned": False,
+        }
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        parts = request.path.strip("/").split("/")
+
+        is_asset = parts[0] in ("avatars", "guilds", "embed", "attachments")
+        if is_asset and request.method == "GET":
+            return web.Response(body=PNG, content_type="image/png")
+
+        route = parts[2:] if parts[:2] == ["api", "v10"] else parts
+
+        if route == ["users", "@me"]:
+            return web.json_response(self.user)
+
+        if route == ["oauth2", "applications", "@me"]:
+            return web.json_response(
+                {
+                    "id": self.user["id"],
+                    "name": self.user["username"],
+                    "icon": None,
+                    "description": "",
+                    "bot_public": True,
+                    "bot_require_code_grant": False,
+                    "owner": self.user,
+                    "verify_key": "",
+                    "flags": 0,
+                }
+            )
+
+        if route[:1] == ["channels"] and route[2:3] == ["messages"]:
+            if request.method in ("POST", "PATCH"):
+                return web.json_response(
+                    self.message(route[1], await self._payload(request))
+                )
+
+        if route[:1] == ["webhooks"] and request.method == "POST":
+            return web.json_response(
+                self.message(str(self.snowflake()), await self._payload(request))
+            )
+
+        path = "/".join("{id}" if part.isdigit() else part for part in route)
+        key = f"{request.method} /{path}"
+        self.unhandled[key] = self.unhandled.get(key, 0) + 1
+
+        if request.method == "DELETE":
+            return web.Response(status=204)
+
+        return web.json_response({})
@@ -0,0 +1,41 @@
+"""
+Runs the bot as several clusters, each a process running a group of shards.
+Configured through `Bot.Sharding` in `Config.toml`, use `bot.py` for a single process.
+"""
+import asyncio
+import logging
+
+import discord
+
+from cogs._utils.cluster import ClusterLauncher, recommended_shards
+from cogs._utils.config import load_config
+
+
+logger = logging.getLogger("discord")
+
+
+def main() -> None:
+    discord.utils.setup_logging()
+    config = load_config("Config.toml")
+    bot = config["Bot"]
+
+    # every cluster would try to create these and write the config at the same time.
+    if not bot["GUILD_ID"] or (
+        bot["Output"]["SEND_TO_WEBHOOK"] and not bot["Output"]["WEBHOOK"]
+    ):
+        raise SystemExit(
+            "Run `bot.py` once first, so `GUILD_ID` and the output `WEBHOOK` are set."
+        )
+
+    sharding = bot.get("Sharding", {})
+    shard_count = sharding.get("SHARD_COUNT") or asyncio.run(
+        recommended_shards(bot["TOKEN"])
+    )
+    clusters = max(1, min(sharding.get("CLUSTERS", 1), shard_count))
+
+    logger.info(f"Launching {shard_count} shard(s) over {clusters} cluster(s).")
+    ClusterLauncher(shard_count=shard_count, clusters=clusters).run()
+
+
+if __name__ == "__main__":
+    main()
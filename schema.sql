@@ -22,6 +22,22 @@ CREATE TABLE IF NOT EXISTS avatar_history (
     avatar_url TEXT NOT NULL
 );
 
+-- rows of an avatar that was already archived point to the same `avatar_url`, instead of uploading it again.
+ALTER TABLE avatar_history
+    ADD COLUMN IF NOT EXISTS avatar_hash TEXT, -- SHA-256 of the image, NULL for rows from before it was kept.
+    ADD COLUMN IF NOT EXISTS asset_key TEXT; -- the CDN path, e.g. `avatars/<USER_ID>/<HASH>.png`.
+
+CREATE INDEX IF NOT EXISTS avatar_history_avatar_hash_idx ON avatar_history (avatar_hash);
+CREATE INDEX IF NOT EXISTS avatar_history_asset_key_idx ON avatar_history (asset_key);
+
+CREATE TABLE IF NOT EXISTS avatar_backfill ( -- logging the avatars of a newly joined guild's members, resumed after restarts. deleted once finished.
+    guild_id BIGINT PRIMARY KEY,
+    next_user_id BIGINT NOT NULL, -- members are done in ID order, everyone below this is done.
+    total INT NOT NULL,
+    done INT NOT NULL,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS animanga_reminders (
     user_id BIGINT NOT NULL,
     reminder_time TIMESTAMP WITH TIME ZONE NOT NULL,